@@ -4,30 +4,49 @@ API Dependencies
 Authentication and authorization dependencies for FastAPI endpoints.
 """
 
-from fastapi import Depends, HTTPException, Header, status
+from fastapi import Depends, HTTPException, Header, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from redis import asyncio as aioredis
 import jwt
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Union
+import asyncio
 import hashlib
+import hmac
+import json
 import logging
+import time
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.exceptions import AuthenticationError, AuthorizationError
 from app.models.database import User, APIKey
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
+# Frozen at import so the per-request path skips BaseSettings attribute access
+RATE_PER_MIN = int(settings.rate_limit_per_minute)
+RATE_PER_HOUR = int(settings.rate_limit_per_hour)
+
 
 class AuthService:
     """Authentication service for handling JWT and API key validation."""
-    
+
+    # Bounded in-process cache of decoded token payloads
+    DECODE_CACHE_SIZE = 10000
+
     def __init__(self):
         self.secret_key = settings.jwt_secret
         self.algorithm = settings.jwt_algorithm
         self.frontend_api_key = settings.frontend_api_key
+        self._frontend_api_key_bytes = settings.frontend_api_key.encode("utf-8")
+        self.api_key_pepper = settings.api_key_pepper.encode("utf-8")
+        self._decode_cache: OrderedDict = OrderedDict()
     
     def create_access_token(self, user_id: str, expires_delta: timedelta = None) -> str:
         """Create JWT access token for user."""
@@ -46,39 +65,303 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
-    def verify_token(self, token: str) -> str:
-        """Verify JWT token and return user_id."""
+    def decode_token(self, token: str) -> Dict[str, Any]:
+        """Decode and validate JWT token, returning the full payload.
+
+        Signature verification dominates the CPU cost here, so decoded
+        payloads are kept in a small LRU keyed by a hash of the token and
+        reused until the token's own exp passes.
+        """
+        cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+        cached = self._decode_cache.get(cache_key)
+        if cached is not None:
+            if cached.get("exp", 0) > time.time():
+                self._decode_cache.move_to_end(cache_key)
+                return cached
+            del self._decode_cache[cache_key]
+
+        payload = self._decode_token_uncached(token)
+
+        self._decode_cache[cache_key] = payload
+        if len(self._decode_cache) > self.DECODE_CACHE_SIZE:
+            self._decode_cache.popitem(last=False)
+
+        return payload
+
+    def _decode_token_uncached(self, token: str) -> Dict[str, Any]:
+        """Run the actual JWT signature verification and claim checks."""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            user_id = payload.get("user_id")
-            
-            if user_id is None:
-                raise AuthenticationError("Invalid token: missing user_id")
-            
-            # Check token type
-            if payload.get("type") != "access":
+            # Required claims are enforced inside the library fast path,
+            # so a malformed token fails before any Python-level checks
+            payload = jwt.decode(
+                token,
+                self.secret_key,
+                algorithms=(self.algorithm,),
+                options={"require": ["exp", "iat", "user_id", "type"]},
+            )
+
+            # Claim-value check; PyJWT's `require` only validates presence
+            if payload["type"] != "access":
                 raise AuthenticationError("Invalid token type")
-            
-            return user_id
-            
+
+            return payload
+
         except jwt.ExpiredSignatureError:
             raise AuthenticationError("Token has expired")
-        except jwt.JWTError as e:
+        except jwt.InvalidTokenError as e:
             raise AuthenticationError(f"Invalid token: {str(e)}")
+
+    def verify_token(self, token: str) -> str:
+        """Verify JWT token and return user_id."""
+        return self.decode_token(token)["user_id"]
     
     def verify_api_key(self, api_key: str) -> bool:
-        """Verify API key for frontend access."""
-        return api_key == self.frontend_api_key
+        """Verify API key for frontend access (constant-time compare)."""
+        return hmac.compare_digest(api_key.encode("utf-8"), self._frontend_api_key_bytes)
     
     def hash_api_key(self, api_key: str) -> str:
-        """Hash API key for storage."""
-        return hashlib.sha256(api_key.encode()).hexdigest()
+        """Hash API key for storage using keyed BLAKE2b.
+
+        BLAKE2b is faster than SHA-256 at the same 256-bit output size, and
+        the pepper key prevents offline brute-forcing of leaked hashes.
+        """
+        return hashlib.blake2b(
+            api_key.encode("utf-8"),
+            digest_size=32,
+            key=self.api_key_pepper
+        ).hexdigest()
 
 
 # Global auth service instance
 auth_service = AuthService()
 
 
+@dataclass
+class CachedUser:
+    """Lightweight user snapshot rebuilt from the token cache.
+
+    Mirrors the User columns read by the endpoints so cache hits can skip
+    the database entirely.
+    """
+
+    id: str
+    email: str
+    username: Optional[str]
+    full_name: Optional[str]
+    credits_balance: int
+    total_credits_purchased: int
+    total_credits_used: int
+    is_active: bool
+    is_verified: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        """Build a snapshot from an ORM User row."""
+        return cls(
+            id=str(user.id),
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            credits_balance=user.credits_balance,
+            total_credits_purchased=user.total_credits_purchased,
+            total_credits_used=user.total_credits_used,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+            created_at=user.created_at,
+            last_login=user.last_login,
+        )
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Serialize to a JSON-safe dict for Redis storage."""
+        payload = self.__dict__.copy()
+        payload["created_at"] = self.created_at.isoformat() if self.created_at else None
+        payload["last_login"] = self.last_login.isoformat() if self.last_login else None
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "CachedUser":
+        """Rebuild a snapshot from a cached dict."""
+        data = dict(payload)
+        for field in ("created_at", "last_login"):
+            if data.get(field):
+                data[field] = datetime.fromisoformat(data[field])
+        return cls(**data)
+
+
+class TokenCache:
+    """Redis-backed cache mapping verified JWT tokens to user snapshots.
+
+    Keys are a BLAKE2b hash of the token (never the raw token), with TTL
+    bounded by the token's own expiry so entries can't outlive the JWT.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client
+
+    def _get_client(self):
+        """Lazily create the async Redis client."""
+        if self.redis_client is None:
+            try:
+                self.redis_client = aioredis.from_url(
+                    settings.redis_url,
+                    max_connections=settings.redis_max_connections,
+                    decode_responses=True,
+                )
+            except Exception as e:
+                logger.error(f"Token cache Redis connection failed: {str(e)}")
+        return self.redis_client
+
+    @staticmethod
+    def make_key(token: str) -> str:
+        """Derive the cache key from a token hash."""
+        return "jwt:" + hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
+    async def get(self, token: str) -> Optional[CachedUser]:
+        """Look up a cached user snapshot for a token."""
+        client = self._get_client()
+        if client is None:
+            return None
+
+        try:
+            cached = await client.get(self.make_key(token))
+            if cached is None:
+                return None
+            return CachedUser.from_payload(json.loads(cached))
+        except Exception as e:
+            logger.error(f"Token cache lookup failed: {str(e)}")
+            return None
+
+    async def set(self, token: str, user: CachedUser, expires_at: Optional[int]):
+        """Cache a user snapshot with TTL bounded by token expiry."""
+        client = self._get_client()
+        if client is None:
+            return
+
+        try:
+            ttl = int(expires_at - time.time()) if expires_at else 0
+            if ttl <= 0:
+                return
+            await client.setex(self.make_key(token), ttl, json.dumps(user.to_payload()))
+        except Exception as e:
+            logger.error(f"Token cache store failed: {str(e)}")
+
+
+# Global token cache instance
+token_cache = TokenCache()
+
+
+class LastLoginTracker:
+    """Write-behind buffer for last_login updates.
+
+    Logins are recorded into a Redis hash (one HSET per request) and
+    flushed to the database in a single batched pass by a background
+    task, instead of a SQL UPDATE + commit on every authenticated
+    request.
+    """
+
+    pending_key = "auth:last_login:pending"
+
+    def __init__(self, redis_client=None, flush_interval: float = 30.0):
+        self.redis_client = redis_client
+        self.flush_interval = flush_interval
+
+    def _get_client(self):
+        """Lazily create the async Redis client."""
+        if self.redis_client is None:
+            try:
+                self.redis_client = aioredis.from_url(
+                    settings.redis_url,
+                    max_connections=settings.redis_max_connections,
+                    decode_responses=True,
+                )
+            except Exception as e:
+                logger.error(f"Last-login tracker Redis connection failed: {str(e)}")
+        return self.redis_client
+
+    async def record(self, user_id: str):
+        """Record a login timestamp for later flushing."""
+        client = self._get_client()
+        if client is None:
+            return
+
+        try:
+            await client.hset(self.pending_key, user_id, datetime.utcnow().isoformat())
+        except Exception as e:
+            logger.error(f"Error recording last login: {str(e)}")
+
+    def _flush_to_db(self, pending: Dict[str, str]) -> int:
+        """Write a drained batch of last_login updates synchronously."""
+        db = SessionLocal()
+        try:
+            # ORM bulk-UPDATE-by-primary-key: handing update(User) a list
+            # of rows keyed by "id" expands into one executemany
+            db.execute(
+                update(User),
+                [
+                    {"id": user_id, "last_login": datetime.fromisoformat(ts)}
+                    for user_id, ts in pending.items()
+                ],
+            )
+            db.commit()
+            return len(pending)
+        except Exception as e:
+            logger.error(f"Error flushing last-login updates: {str(e)}")
+            db.rollback()
+            return 0
+        finally:
+            db.close()
+
+    async def flush(self) -> int:
+        """Flush all pending last_login updates in one database pass."""
+        client = self._get_client()
+        if client is None:
+            return 0
+
+        try:
+            pending = await client.hgetall(self.pending_key)
+        except Exception as e:
+            logger.error(f"Error reading last-login buffer: {str(e)}")
+            return 0
+
+        if not pending:
+            return 0
+
+        # Synchronous SQLAlchemy must not run on the event loop; the
+        # background task would stall every request for the DB round-trip
+        flushed = await asyncio.to_thread(self._flush_to_db, pending)
+
+        # Only drop entries after the write committed, so a failed flush
+        # retries the batch next interval instead of losing it. A login
+        # recorded mid-flush may be re-flushed with its newer timestamp
+        # on the user's next request, which is harmless for last_login.
+        if flushed:
+            try:
+                await client.hdel(self.pending_key, *pending.keys())
+            except Exception as e:
+                logger.error(f"Error trimming last-login buffer: {str(e)}")
+
+        return flushed
+
+    async def run(self):
+        """Background loop flushing the buffer every flush_interval seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                flushed = await self.flush()
+                if flushed:
+                    logger.debug(f"Flushed {flushed} last-login updates")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Last-login flush loop error: {str(e)}")
+
+
+# Global last-login tracker instance
+last_login_tracker = LastLoginTracker()
+
+
 async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> bool:
     """
     Verify API key from header.
@@ -93,7 +376,8 @@ async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> boo
         AuthenticationError: If API key is invalid
     """
     if not auth_service.verify_api_key(x_api_key):
-        logger.warning(f"Invalid API key attempt: {x_api_key[:10]}...")
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(f"Invalid API key attempt: {x_api_key[:10]}...")
         raise AuthenticationError("Invalid API key")
     
     return True
@@ -124,57 +408,117 @@ async def verify_jwt_token(
         raise AuthenticationError("Token verification failed")
 
 
-async def get_current_user(
-    user_id: str = Depends(verify_jwt_token),
-    db: Session = Depends(get_db)
-) -> User:
+async def _resolve_token_user(token: str, db: Session) -> Union[User, CachedUser]:
     """
-    Get current user from database.
-    
+    Resolve a bearer token to a user, consulting the token cache first.
+
     Args:
-        user_id: User ID from JWT token
-        db: Database session
-        
+        token: Raw JWT token
+        db: Database session (used only on cache miss)
+
     Returns:
-        User: Current user object
-        
+        User: Current user object (cached snapshot on repeat requests)
+
     Raises:
-        AuthenticationError: If user not found or inactive
+        AuthenticationError: If token invalid, user not found or inactive
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    # Fast path: repeat requests with the same token skip jwt.decode and SQL
+    cached_user = await token_cache.get(token)
+    if cached_user is not None:
+        if not cached_user.is_active:
+            raise AuthenticationError("User account is inactive")
+        await last_login_tracker.record(cached_user.id)
+        return cached_user
+
+    payload = auth_service.decode_token(token)
+    user = db.query(User).filter(User.id == payload["user_id"]).first()
+
     if not user:
         raise AuthenticationError("User not found")
-    
+
     if not user.is_active:
         raise AuthenticationError("User account is inactive")
-    
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
-    
+
+    # Record last login via the write-behind buffer instead of committing here
+    await last_login_tracker.record(str(user.id))
+
+    await token_cache.set(token, CachedUser.from_user(user), payload.get("exp"))
+
     return user
 
 
-async def get_authenticated_user(
-    api_key_valid: bool = Depends(verify_api_key),
-    user: User = Depends(get_current_user)
-) -> User:
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Union[User, CachedUser]:
     """
-    Combined authentication: API key + JWT token.
-    
+    Get current user from the Authorization header.
+
     Args:
-        api_key_valid: API key validation result
-        user: Current user from JWT token
-        
+        credentials: JWT credentials from Authorization header
+        db: Database session
+
+    Returns:
+        User: Current user object
+    """
+    return await _resolve_token_user(credentials.credentials, db)
+
+
+async def authenticated_user(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> Union[User, CachedUser]:
+    """
+    Fused authentication dependency: API key + JWT token in one pass.
+
+    Reads both headers directly from the request, avoiding the extra
+    sub-dependency resolutions (and potential threadpool hops) of the old
+    verify_api_key -> verify_jwt_token -> get_current_user chain.
+
+    Args:
+        request: Incoming request
+        db: Database session
+
     Returns:
         User: Authenticated user
+
+    Raises:
+        AuthenticationError: If API key or token is invalid
     """
+    api_key = request.headers.get("x-api-key")
+    if not api_key or not auth_service.verify_api_key(api_key):
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning(f"Invalid API key attempt: {(api_key or '')[:10]}...")
+        raise AuthenticationError("Invalid API key")
+
+    authorization = request.headers.get("authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        raise AuthenticationError("Missing bearer token")
+
+    user = await _resolve_token_user(authorization[7:], db)
+
+    # Precompute the serializable user payload once; endpoints that only
+    # echo user fields return (a slice of) this dict instead of repeating
+    # the attribute reads and UUID-to-str conversions per request
+    request.state.user_payload = {
+        "user_id": str(user.id),
+        "email": user.email,
+        "username": user.username,
+        "full_name": user.full_name,
+        "credits_balance": user.credits_balance,
+        "total_credits_purchased": user.total_credits_purchased,
+        "total_credits_used": user.total_credits_used,
+        "is_active": user.is_active,
+        "is_verified": user.is_verified,
+        "created_at": user.created_at,
+        "last_login": user.last_login,
+    }
+
     return user
 
 
 async def check_user_credits(
-    user: User = Depends(get_authenticated_user),
+    user: User = Depends(authenticated_user),
     required_credits: int = 1
 ) -> User:
     """
@@ -198,12 +542,73 @@ async def check_user_credits(
     return user
 
 
+# Atomic fixed-window counter: INCR and set the window TTL on first hit,
+# all in a single round-trip.
+_RATE_LIMIT_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
+
 class RateLimiter:
-    """Rate limiting functionality."""
-    
+    """Fixed-window rate limiting with one Redis round-trip per check.
+
+    Each (key, window) pair maps to a counter key suffixed with the current
+    window bucket, so memory stays O(1) per key and old buckets expire on
+    their own.
+    """
+
+    # Cap on the local pre-check table so it can't grow without bound
+    LOCAL_BUCKETS_MAX = 50000
+
     def __init__(self, redis_client=None):
         self.redis_client = redis_client
-    
+        self._script = None
+        self._local_buckets: Dict[str, tuple] = {}
+
+    def _get_client(self):
+        """Lazily create the async Redis client."""
+        if self.redis_client is None:
+            try:
+                self.redis_client = aioredis.from_url(
+                    settings.redis_url,
+                    max_connections=settings.redis_max_connections,
+                )
+            except Exception as e:
+                logger.error(f"Rate limiter Redis connection failed: {str(e)}")
+        return self.redis_client
+
+    def _local_allow(self, key: str, limit: int, window_seconds: int) -> bool:
+        """Per-process token-bucket pre-check.
+
+        Refills at limit/window tokens per second. A True result means
+        this process alone is nowhere near the limit, so the Redis
+        round-trip can be skipped; under-counting locally is safe because
+        Redis remains the authority once a bucket runs dry.
+        """
+        now = time.time()
+        tokens, last_refill = self._local_buckets.get(key, (float(limit), now))
+        tokens = min(float(limit), tokens + (now - last_refill) * (limit / window_seconds))
+
+        if tokens < 1.0:
+            self._local_buckets[key] = (tokens, now)
+            return False
+
+        if key not in self._local_buckets and len(self._local_buckets) >= self.LOCAL_BUCKETS_MAX:
+            self._local_buckets.clear()
+
+        self._local_buckets[key] = (tokens - 1.0, now)
+        return True
+
+    def _get_script(self, client):
+        """Register the counter script once per process."""
+        if self._script is None:
+            self._script = client.register_script(_RATE_LIMIT_SCRIPT)
+        return self._script
+
     async def check_rate_limit(
         self,
         key: str,
@@ -212,40 +617,55 @@ class RateLimiter:
     ) -> bool:
         """
         Check if request is within rate limit.
-        
+
         Args:
             key: Rate limit key (e.g., user_id, api_key)
             limit: Maximum requests allowed
             window_seconds: Time window in seconds
-            
+
         Returns:
             bool: True if within limit, False otherwise
         """
-        if not self.redis_client:
-            return True  # No rate limiting if Redis not available
-        
+        results = await self.check_rate_limits([(key, limit, window_seconds)])
+        return results[0]
+
+    async def check_rate_limits(self, checks) -> list:
+        """
+        Check several rate limits in a single pipelined round-trip.
+
+        Args:
+            checks: Sequence of (key, limit, window_seconds) tuples
+
+        Returns:
+            list: One bool per check, True if within limit
+        """
+        # Fast path: while every window is comfortably under its limit in
+        # this process, skip the Redis round-trip entirely
+        if all(self._local_allow(key, limit, window) for key, limit, window in checks):
+            return [True] * len(checks)
+
+        client = self._get_client()
+        if client is None:
+            return [True] * len(checks)  # No rate limiting if Redis not available
+
         try:
-            current_time = datetime.utcnow().timestamp()
-            window_start = current_time - window_seconds
-            
-            # Remove old entries
-            self.redis_client.zremrangebyscore(key, 0, window_start)
-            
-            # Count current requests
-            current_count = self.redis_client.zcard(key)
-            
-            if current_count >= limit:
-                return False
-            
-            # Add current request
-            self.redis_client.zadd(key, {str(current_time): current_time})
-            self.redis_client.expire(key, window_seconds)
-            
-            return True
-            
+            script = self._get_script(client)
+            now = int(time.time())
+
+            pipe = client.pipeline(transaction=False)
+            for key, _limit, window_seconds in checks:
+                window_key = f"{key}:{now // window_seconds}"
+                await script(keys=[window_key], args=[window_seconds], client=pipe)
+            counts = await pipe.execute()
+
+            return [
+                int(count) <= limit
+                for (_key, limit, _window), count in zip(checks, counts)
+            ]
+
         except Exception as e:
             logger.error(f"Rate limiting error: {str(e)}")
-            return True  # Allow request if rate limiting fails
+            return [True] * len(checks)  # Allow request if rate limiting fails
 
 
 # Rate limiter instance (will be initialized with Redis client)
@@ -253,7 +673,7 @@ rate_limiter = RateLimiter()
 
 
 async def rate_limit_check(
-    user: User = Depends(get_authenticated_user)
+    user: User = Depends(authenticated_user)
 ) -> User:
     """
     Rate limiting dependency.
@@ -267,24 +687,22 @@ async def rate_limit_check(
     Raises:
         AuthorizationError: If rate limit exceeded
     """
-    # Check per-minute rate limit
-    if not await rate_limiter.check_rate_limit(
-        f"rate_limit:user:{user.id}:minute",
-        settings.rate_limit_per_minute,
-        60
-    ):
+    # Check minute and hour windows in one pipelined round-trip. The
+    # {user.id} hash tag pins both windows to the same Redis Cluster slot
+    # so the pipelined/scripted check stays a single-node operation.
+    minute_ok, hour_ok = await rate_limiter.check_rate_limits([
+        (f"rate:{{{user.id}}}:m", RATE_PER_MIN, 60),
+        (f"rate:{{{user.id}}}:h", RATE_PER_HOUR, 3600),
+    ])
+
+    if not minute_ok:
         raise AuthorizationError(
-            f"Rate limit exceeded: {settings.rate_limit_per_minute} requests per minute"
+            f"Rate limit exceeded: {RATE_PER_MIN} requests per minute"
         )
-    
-    # Check per-hour rate limit
-    if not await rate_limiter.check_rate_limit(
-        f"rate_limit:user:{user.id}:hour",
-        settings.rate_limit_per_hour,
-        3600
-    ):
+
+    if not hour_ok:
         raise AuthorizationError(
-            f"Rate limit exceeded: {settings.rate_limit_per_hour} requests per hour"
+            f"Rate limit exceeded: {RATE_PER_HOUR} requests per hour"
         )
-    
+
     return user
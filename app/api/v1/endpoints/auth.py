@@ -4,13 +4,14 @@ Authentication Endpoints
 User authentication and token management endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import logging
 
 from app.core.database import get_db
-from app.api.v1.dependencies import get_authenticated_user, auth_service
+from app.api.v1.dependencies import authenticated_user, auth_service
 from app.models.database import User
 from app.models.schemas import UserCreditsResponse
 from app.core.exceptions import AuthenticationError
@@ -19,29 +20,31 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
-@router.post("/verify-token")
-async def verify_token(user: User = Depends(get_authenticated_user)):
+@router.post("/verify-token", response_class=ORJSONResponse)
+async def verify_token(request: Request, user: User = Depends(authenticated_user)):
     """
     Verify JWT token validity.
-    
+
     Args:
+        request: Incoming request (carries the precomputed user payload)
         user: Authenticated user from token
-        
+
     Returns:
         dict: Token verification result
     """
+    payload = request.state.user_payload
     return {
         "valid": True,
-        "user_id": str(user.id),
-        "email": user.email,
-        "credits_balance": user.credits_balance,
-        "is_active": user.is_active,
-        "verified_at": datetime.utcnow().isoformat()
+        "user_id": payload["user_id"],
+        "email": payload["email"],
+        "credits_balance": payload["credits_balance"],
+        "is_active": payload["is_active"],
+        "verified_at": datetime.utcnow()
     }
 
 
 @router.post("/refresh-token")
-async def refresh_token(user: User = Depends(get_authenticated_user)):
+async def refresh_token(user: User = Depends(authenticated_user)):
     """
     Refresh JWT token.
     
@@ -74,52 +77,43 @@ async def refresh_token(user: User = Depends(get_authenticated_user)):
 
 
 @router.get("/user-credits", response_model=UserCreditsResponse)
-async def get_user_credits(user: User = Depends(get_authenticated_user)):
+async def get_user_credits(request: Request, user: User = Depends(authenticated_user)):
     """
     Get user's credit information.
-    
+
     Args:
+        request: Incoming request (carries the precomputed user payload)
         user: Authenticated user
-        
+
     Returns:
         UserCreditsResponse: User's credit information
     """
+    payload = request.state.user_payload
     return UserCreditsResponse(
-        user_id=str(user.id),
-        credits_balance=user.credits_balance,
-        total_credits_purchased=user.total_credits_purchased,
-        total_credits_used=user.total_credits_used
+        user_id=payload["user_id"],
+        credits_balance=payload["credits_balance"],
+        total_credits_purchased=payload["total_credits_purchased"],
+        total_credits_used=payload["total_credits_used"]
     )
 
 
 @router.get("/user-profile")
-async def get_user_profile(user: User = Depends(get_authenticated_user)):
+async def get_user_profile(request: Request, user: User = Depends(authenticated_user)):
     """
     Get user's profile information.
-    
+
     Args:
+        request: Incoming request (carries the precomputed user payload)
         user: Authenticated user
-        
+
     Returns:
         dict: User profile information
     """
-    return {
-        "user_id": str(user.id),
-        "email": user.email,
-        "username": user.username,
-        "full_name": user.full_name,
-        "credits_balance": user.credits_balance,
-        "total_credits_purchased": user.total_credits_purchased,
-        "total_credits_used": user.total_credits_used,
-        "is_active": user.is_active,
-        "is_verified": user.is_verified,
-        "created_at": user.created_at.isoformat(),
-        "last_login": user.last_login.isoformat() if user.last_login else None
-    }
+    return request.state.user_payload
 
 
 @router.post("/logout")
-async def logout(user: User = Depends(get_authenticated_user)):
+async def logout(user: User = Depends(authenticated_user)):
     """
     Logout user (client-side token invalidation).
     
@@ -5,10 +5,13 @@ System health and status monitoring endpoints.
 """
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
+from redis import asyncio as aioredis
+from functools import lru_cache
+import asyncio
 import torch
-import redis
 import logging
 
 from app.core.config import settings
@@ -19,43 +22,50 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/health", tags=["health"])
 
 
-def check_redis_connection() -> bool:
-    """Check Redis connectivity."""
+async def check_redis_connection() -> bool:
+    """Check Redis connectivity without blocking the event loop."""
     try:
-        r = redis.from_url(settings.redis_url)
-        r.ping()
+        r = aioredis.from_url(settings.redis_url)
+        try:
+            # Bound the probe so a hung Redis can't stall the health check
+            await asyncio.wait_for(r.ping(), timeout=1.0)
+        finally:
+            await r.close()
         return True
     except Exception as e:
         logger.error(f"Redis connection failed: {e}")
         return False
 
 
-def check_gpu_availability() -> dict:
-    """Check GPU availability and return detailed info."""
+@lru_cache(maxsize=1)
+def gpu_is_available() -> bool:
+    """CUDA availability, cached per process (it can't change at runtime)."""
     try:
-        gpu_available = torch.cuda.is_available()
-        gpu_info = {
-            "available": gpu_available,
-            "device_count": 0,
-            "devices": []
-        }
-
-        if gpu_available:
-            gpu_info["device_count"] = torch.cuda.device_count()
-            for i in range(torch.cuda.device_count()):
-                device_info = {
-                    "index": i,
-                    "name": torch.cuda.get_device_name(i),
-                    "memory_total": torch.cuda.get_device_properties(i).total_memory,
-                    "memory_allocated": torch.cuda.memory_allocated(i),
-                    "memory_reserved": torch.cuda.memory_reserved(i)
-                }
-                gpu_info["devices"].append(device_info)
-
-        return gpu_info
+        return torch.cuda.is_available()
     except Exception as e:
         logger.error(f"GPU check failed: {e}")
-        return {"available": False, "error": str(e)}
+        return False
+
+
+@lru_cache(maxsize=1)
+def _gpu_static_info() -> dict:
+    """Immutable per-process GPU properties, fetched once.
+
+    Device count, name and total memory never change while the process is
+    alive, and each lookup is a CUDA driver call we shouldn't repeat on a
+    frequently-polled endpoint.
+    """
+    if not gpu_is_available():
+        return {}
+    try:
+        return {
+            "device_count": torch.cuda.device_count(),
+            "device_name": torch.cuda.get_device_name(0),
+            "memory_total": torch.cuda.get_device_properties(0).total_memory,
+        }
+    except Exception as e:
+        logger.error(f"Error reading GPU properties: {e}")
+        return {}
 
 
 @router.get("/", response_model=HealthCheckResponse)
@@ -66,15 +76,19 @@ async def health_check(db: Session = Depends(get_db)):
     Returns:
         HealthCheckResponse: System health status
     """
-    # Check database
-    db_status = check_db_connection()
-    
-    # Check Redis
-    redis_status = check_redis_connection()
-    
-    # Check GPU
-    gpu_info = check_gpu_availability()
-    gpu_status = gpu_info.get("available", False)
+    # Run all probes concurrently; total latency is the slowest probe,
+    # not the sum. Sync checks run off the event loop.
+    db_status, redis_status, gpu_status = await asyncio.gather(
+        asyncio.to_thread(check_db_connection),
+        check_redis_connection(),
+        asyncio.to_thread(gpu_is_available),
+        return_exceptions=True,
+    )
+
+    # Treat a failed probe as unhealthy rather than propagating
+    db_status = db_status is True
+    redis_status = redis_status is True
+    gpu_status = gpu_status is True
 
     # Determine overall status (GPU is optional)
     overall_status = "healthy" if all([db_status, redis_status]) else "unhealthy"
@@ -89,17 +103,17 @@ async def health_check(db: Session = Depends(get_db)):
     )
 
 
-@router.get("/simple")
+@router.get("/simple", response_class=ORJSONResponse)
 async def simple_health_check():
     """
     Simple health check for load balancers.
-    
+
     Returns:
         dict: Basic status information
     """
     return {
         "status": "ok",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
 
 
@@ -111,8 +125,8 @@ async def database_health_check(db: Session = Depends(get_db)):
     Returns:
         dict: Database connectivity status
     """
-    db_status = check_db_connection()
-    
+    db_status = await asyncio.to_thread(check_db_connection)
+
     return {
         "database": {
             "status": "connected" if db_status else "disconnected",
@@ -129,8 +143,8 @@ async def redis_health_check():
     Returns:
         dict: Redis connectivity status
     """
-    redis_status = check_redis_connection()
-    
+    redis_status = await check_redis_connection()
+
     return {
         "redis": {
             "status": "connected" if redis_status else "disconnected",
@@ -147,19 +161,19 @@ async def gpu_health_check():
     Returns:
         dict: GPU availability and information
     """
-    gpu_available = check_gpu_availability()
+    gpu_available = gpu_is_available()
     gpu_info = {}
-    
+
     if gpu_available:
         try:
-            gpu_info = {
-                "device_count": torch.cuda.device_count(),
+            # Static properties come from the per-process cache; only the
+            # memory counters are queried live.
+            gpu_info = dict(_gpu_static_info())
+            gpu_info.update({
                 "current_device": torch.cuda.current_device(),
-                "device_name": torch.cuda.get_device_name(),
                 "memory_allocated": torch.cuda.memory_allocated(),
                 "memory_reserved": torch.cuda.memory_reserved(),
-                "memory_total": torch.cuda.get_device_properties(0).total_memory
-            }
+            })
         except Exception as e:
             logger.error(f"Error getting GPU info: {e}")
     
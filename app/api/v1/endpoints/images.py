@@ -4,15 +4,15 @@ Image Processing Endpoints
 Main endpoints for image enhancement and upscaling operations.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from typing import List
 import logging
 import uuid
 from datetime import datetime
 
-from app.core.database import get_db
-from app.api.v1.dependencies import get_authenticated_user, rate_limit_check
+from app.core.database import get_db, get_session_factory
+from app.api.v1.dependencies import authenticated_user, rate_limit_check
 from app.models.database import User, ProcessingJob
 from app.models.schemas import (
     ImageProcessRequest, 
@@ -32,78 +32,108 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/images", tags=["image-processing"])
 
 
+def _job_response_data(job: ProcessingJob) -> dict:
+    """Build JobStatusResponse kwargs from a job row."""
+    response_data = {
+        "job_id": str(job.id),
+        "status": JobStatus(job.status),
+        "progress": job.progress,
+        "operation": job.operation,
+        "parameters": job.parameters,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "completed_at": job.completed_at
+    }
+
+    # Add results if completed
+    if job.status == "completed" and job.output_images:
+        response_data["result_urls"] = job.output_images
+        response_data["processing_time"] = job.processing_time_seconds
+
+    # Add error message if failed
+    if job.status == "failed" and job.error_message:
+        response_data["error_message"] = job.error_message
+
+    return response_data
+
+
+# DB-bound handlers are plain def: FastAPI runs them in the threadpool,
+# so synchronous SQLAlchemy I/O never blocks the event loop. The async
+# dependencies (auth, rate limiting) still run on the loop as before.
 @router.post("/process", response_model=JobResponse)
-async def process_images(
+def process_images(
     request: ImageProcessRequest,
     background_tasks: BackgroundTasks,
     user: User = Depends(rate_limit_check),
-    db: Session = Depends(get_db)
+    session_factory=Depends(get_session_factory)
 ):
     """
     Process images with enhancement or upscaling.
-    
+
     Args:
         request: Image processing request
         background_tasks: FastAPI background tasks
         user: Authenticated user
-        db: Database session
-        
+        session_factory: Database session factory
+
     Returns:
         JobResponse: Job creation response with job ID and status
     """
     try:
-        # Initialize services
-        credit_service = CreditService(db)
-        image_service = ImageService(db)
-        
-        # Calculate processing cost
-        cost = credit_service.calculate_cost(
-            operation=request.operation.value,
-            parameters=request.parameters.dict(),
-            image_count=len(request.images)
-        )
-        
-        logger.info(f"Processing request from user {user.id}: {len(request.images)} images, cost: {cost} credits")
-        
-        # Check and reserve credits
-        if not credit_service.check_and_reserve_credits(str(user.id), cost):
-            raise InsufficientCreditsError(
-                required=cost,
-                available=user.credits_balance
+        # Do all database work in a short-lived session so the pooled
+        # connection is returned before queueing and response building
+        with session_factory() as db:
+            credit_service = CreditService(db)
+            image_service = ImageService(db)
+
+            # Calculate processing cost
+            cost = credit_service.calculate_cost(
+                operation=request.operation.value,
+                parameters=request.parameters.model_dump(),
+                image_count=len(request.images)
             )
-        
-        # Create processing job
-        job = image_service.create_job(
-            user_id=str(user.id),
-            request=request,
-            estimated_cost=cost
-        )
-        
+
+            logger.info(f"Processing request from user {user.id}: {len(request.images)} images, cost: {cost} credits")
+
+            # Check and reserve credits; the new balance comes back directly so
+            # we don't re-read the user row afterwards
+            new_balance = credit_service.check_and_reserve_credits(str(user.id), cost)
+            if new_balance is None:
+                raise InsufficientCreditsError(
+                    required=cost,
+                    available=user.credits_balance
+                )
+
+            # Create processing job
+            job = image_service.create_job(
+                user_id=str(user.id),
+                request=request,
+                estimated_cost=cost
+            )
+            job_id = str(job.id)
+
         # Queue job for processing
         background_tasks.add_task(
             image_service.queue_processing_job,
-            job.id,
-            request.dict()
+            job_id,
+            request.model_dump(mode="json")
         )
-        
-        # Get updated user credits
-        updated_user = db.query(User).filter(User.id == user.id).first()
-        
-        # Estimate processing time
+
+        # Estimate processing time (pure computation, no session needed)
         estimated_time = image_service.estimate_processing_time(
             len(request.images),
             request.operation.value,
-            request.parameters.dict()
+            request.parameters.model_dump()
         )
-        
-        logger.info(f"Job {job.id} created successfully for user {user.id}")
-        
+
+        logger.info(f"Job {job_id} created successfully for user {user.id}")
+
         return JobResponse(
-            job_id=str(job.id),
+            job_id=job_id,
             status=JobStatus.QUEUED,
             estimated_time=estimated_time,
             credits_used=cost,
-            credits_remaining=updated_user.credits_balance,
+            credits_remaining=new_balance,
             message="Job queued successfully for processing"
         )
         
@@ -116,53 +146,35 @@ async def process_images(
 
 
 @router.get("/status/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(
+def get_job_status(
     job_id: str,
-    user: User = Depends(get_authenticated_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(authenticated_user),
+    session_factory=Depends(get_session_factory)
 ):
     """
     Get processing job status.
-    
+
     Args:
         job_id: Job identifier
         user: Authenticated user
-        db: Database session
-        
+        session_factory: Database session factory
+
     Returns:
         JobStatusResponse: Current job status and details
     """
     try:
-        # Find job
-        job = db.query(ProcessingJob).filter(
-            ProcessingJob.id == job_id,
-            ProcessingJob.user_id == user.id
-        ).first()
-        
-        if not job:
-            raise JobNotFoundError(job_id)
-        
-        # Prepare response
-        response_data = {
-            "job_id": str(job.id),
-            "status": JobStatus(job.status),
-            "progress": job.progress,
-            "operation": job.operation,
-            "parameters": job.parameters,
-            "created_at": job.created_at,
-            "started_at": job.started_at,
-            "completed_at": job.completed_at
-        }
-        
-        # Add results if completed
-        if job.status == "completed" and job.output_images:
-            response_data["result_urls"] = job.output_images
-            response_data["processing_time"] = job.processing_time_seconds
-        
-        # Add error message if failed
-        if job.status == "failed" and job.error_message:
-            response_data["error_message"] = job.error_message
-        
+        # Find job; session is released as soon as the row is read
+        with session_factory() as db:
+            job = db.query(ProcessingJob).filter(
+                ProcessingJob.id == job_id,
+                ProcessingJob.user_id == user.id
+            ).first()
+
+            if not job:
+                raise JobNotFoundError(job_id)
+
+            response_data = _job_response_data(job)
+
         return JobStatusResponse(**response_data)
         
     except JobNotFoundError:
@@ -172,62 +184,54 @@ async def get_job_status(
         raise ImageProcessingError("Failed to get job status", details=str(e))
 
 
-@router.get("/jobs", response_model=List[JobStatusResponse])
-async def get_user_jobs(
+@router.get("/jobs")
+def get_user_jobs(
     limit: int = 10,
-    offset: int = 0,
+    after: datetime = None,
     status: str = None,
-    user: User = Depends(get_authenticated_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(authenticated_user),
+    session_factory=Depends(get_session_factory)
 ):
     """
-    Get user's processing jobs with pagination.
-    
+    Get user's processing jobs with keyset pagination.
+
     Args:
         limit: Maximum number of jobs to return
-        offset: Number of jobs to skip
+        after: Cursor: only return jobs created before this timestamp
+            (pass the next_cursor from the previous page)
         status: Filter by job status (optional)
         user: Authenticated user
-        db: Database session
-        
+        session_factory: Database session factory
+
     Returns:
-        List[JobStatusResponse]: List of user's jobs
+        dict: Page of jobs plus next_cursor for the following page
     """
     try:
-        # Build query
-        query = db.query(ProcessingJob).filter(ProcessingJob.user_id == user.id)
-        
-        # Apply status filter if provided
-        if status:
-            query = query.filter(ProcessingJob.status == status)
-        
-        # Apply pagination and ordering
-        jobs = query.order_by(ProcessingJob.created_at.desc()).offset(offset).limit(limit).all()
-        
-        # Convert to response format
-        job_responses = []
-        for job in jobs:
-            response_data = {
-                "job_id": str(job.id),
-                "status": JobStatus(job.status),
-                "progress": job.progress,
-                "operation": job.operation,
-                "parameters": job.parameters,
-                "created_at": job.created_at,
-                "started_at": job.started_at,
-                "completed_at": job.completed_at
-            }
-            
-            if job.status == "completed" and job.output_images:
-                response_data["result_urls"] = job.output_images
-                response_data["processing_time"] = job.processing_time_seconds
-            
-            if job.status == "failed" and job.error_message:
-                response_data["error_message"] = job.error_message
-            
-            job_responses.append(JobStatusResponse(**response_data))
-        
-        return job_responses
+        with session_factory() as db:
+            # Build query
+            query = db.query(ProcessingJob).filter(ProcessingJob.user_id == user.id)
+
+            # Apply status filter if provided
+            if status:
+                query = query.filter(ProcessingJob.status == status)
+
+            # Seek predicate instead of OFFSET: the DB range-scans the
+            # (user_id, created_at) index for O(limit) work, rather than
+            # scanning and discarding offset rows
+            if after is not None:
+                query = query.filter(ProcessingJob.created_at < after)
+
+            jobs = query.order_by(ProcessingJob.created_at.desc()).limit(limit).all()
+
+            # Convert to response format while rows are attached
+            job_responses = [JobStatusResponse(**_job_response_data(job)) for job in jobs]
+            # jobs can be empty when limit=0 or the filter matches nothing
+            next_cursor = jobs[-1].created_at.isoformat() if jobs and len(jobs) == limit else None
+
+        return {
+            "jobs": job_responses,
+            "next_cursor": next_cursor
+        }
         
     except Exception as e:
         logger.error(f"Error getting jobs for user {user.id}: {str(e)}")
@@ -235,53 +239,80 @@ async def get_user_jobs(
 
 
 @router.delete("/jobs/{job_id}")
-async def cancel_job(
+def cancel_job(
     job_id: str,
-    user: User = Depends(get_authenticated_user),
-    db: Session = Depends(get_db)
+    user: User = Depends(authenticated_user),
+    session_factory=Depends(get_session_factory)
 ):
     """
     Cancel a processing job.
-    
+
     Args:
         job_id: Job identifier
         user: Authenticated user
-        db: Database session
-        
+        session_factory: Database session factory
+
     Returns:
         dict: Cancellation confirmation
     """
     try:
-        # Find job
-        job = db.query(ProcessingJob).filter(
-            ProcessingJob.id == job_id,
-            ProcessingJob.user_id == user.id
-        ).first()
-        
-        if not job:
-            raise JobNotFoundError(job_id)
-        
-        # Check if job can be cancelled
-        if job.status in ["completed", "failed", "cancelled"]:
-            raise ImageProcessingError(f"Cannot cancel job with status: {job.status}")
-        
-        # Cancel job
-        job.status = "cancelled"
-        job.updated_at = datetime.utcnow()
-        
-        # Refund credits if job was queued
-        if job.status == "queued":
-            credit_service = CreditService(db)
-            credit_service.refund_credits(str(user.id), job.credits_used, f"Job {job_id} cancelled")
-        
-        db.commit()
-        
+        with session_factory() as db:
+            # Load only the fields needed to validate the cancellation
+            row = db.query(ProcessingJob.status, ProcessingJob.credits_used).filter(
+                ProcessingJob.id == job_id,
+                ProcessingJob.user_id == user.id
+            ).first()
+
+            if not row:
+                raise JobNotFoundError(job_id)
+
+            prior_status, credits_used = row
+            now = datetime.utcnow()
+
+            # Check if job can be cancelled
+            if prior_status in ["completed", "failed", "cancelled"]:
+                raise ImageProcessingError(f"Cannot cancel job with status: {prior_status}")
+
+            # Single guarded UPDATE: a job that finishes between the read
+            # and the write is not clobbered
+            updated = db.query(ProcessingJob).filter(
+                ProcessingJob.id == job_id,
+                ProcessingJob.user_id == user.id,
+                ProcessingJob.status.in_(["queued", "processing"])
+            ).update(
+                {"status": "cancelled", "updated_at": now},
+                synchronize_session=False
+            )
+
+            if not updated:
+                db.rollback()
+                raise ImageProcessingError("Job is no longer cancellable")
+
+            # Commit the cancellation on its own before touching credits:
+            # refund_credits rolls the session back on failure, which must
+            # not revert the status change the client is told about
+            db.commit()
+
+            # Refund credits if the job never started processing. The prior
+            # status is checked before the cancelled status is assigned (the
+            # old code compared after assignment, so refunds never happened).
+            if prior_status == "queued":
+                credit_service = CreditService(db)
+                refunded = credit_service.refund_credits(
+                    str(user.id), credits_used, f"Job {job_id} cancelled"
+                )
+                if not refunded:
+                    logger.error(f"Refund of {credits_used} credits failed for cancelled job {job_id}")
+                    raise ImageProcessingError(
+                        "Job was cancelled but the credit refund failed"
+                    )
+
         logger.info(f"Job {job_id} cancelled by user {user.id}")
         
         return {
             "message": "Job cancelled successfully",
             "job_id": job_id,
-            "cancelled_at": datetime.utcnow().isoformat()
+            "cancelled_at": now.isoformat()
         }
         
     except (JobNotFoundError, ImageProcessingError):
@@ -295,7 +326,8 @@ async def cancel_job(
 async def download_result(
     job_id: str,
     image_index: int,
-    user: User = Depends(get_authenticated_user),
+    request: Request,
+    user: User = Depends(authenticated_user),
     db: Session = Depends(get_db)
 ):
     """
@@ -304,11 +336,12 @@ async def download_result(
     Args:
         job_id: Job identifier
         image_index: Index of the image to download
+        request: Incoming request (for conditional headers)
         user: Authenticated user
         db: Database session
         
     Returns:
-        FileResponse: Processed image file
+        Response: Processed image file, or 304 if the client cache is fresh
     """
     try:
         # Find job
@@ -326,9 +359,12 @@ async def download_result(
         if not job.output_images or image_index >= len(job.output_images):
             raise ImageProcessingError("Image not found")
         
-        # Get image service and download file
+        # Get image service and download file (304 on ETag match)
         image_service = ImageService(db)
-        return await image_service.download_result_image(job_id, image_index)
+        return await image_service.download_result_image(
+            job_id, image_index,
+            if_none_match=request.headers.get("if-none-match")
+        )
         
     except (JobNotFoundError, ImageProcessingError):
         raise
@@ -6,12 +6,15 @@ These endpoints should be removed in production.
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import bindparam, lambda_stmt, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from typing import List, Optional
 import uuid
 import logging
 
-from app.core.database import get_db
+from app.core.database import db_txn, get_db
 from app.core.config import settings
 from app.models.database import User, CreditTransaction
 from app.api.v1.dependencies import auth_service, verify_api_key
@@ -20,9 +23,20 @@ from app.services.credit_service import CreditService
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/test", tags=["testing"])
 
+# Statements built once per process. lambda_stmt caches the compiled SQL
+# for the email lookup across calls, and the hoisted Core insert
+# constructs skip rebuilding the INSERT per request.
+_USER_BY_EMAIL = lambda_stmt(
+    lambda: select(User).where(User.email == bindparam("email"))
+)
+_USER_INSERT = User.__table__.insert()
+_TRANSACTION_INSERT = CreditTransaction.__table__.insert()
 
+
+# Handlers here run sync SQLAlchemy queries, so they are plain def and
+# execute in the threadpool instead of blocking the event loop.
 @router.post("/create-user")
-async def create_test_user(
+def create_test_user(
     email: str,
     credits: int = 100,
     api_key_valid: bool = Depends(verify_api_key),
@@ -38,70 +52,122 @@ async def create_test_user(
     Returns:
         dict: User info and JWT token
     """
+    # Create new user and initial credit transaction in one commit.
+    # The id is generated client-side, so the transaction can reference
+    # it without an intermediate flush/refresh.
+    user_id = uuid.uuid4()
+    user = User(
+        id=user_id,
+        email=email,
+        username=email.split('@')[0],
+        full_name=f"Test User {email.split('@')[0]}",
+        credits_balance=credits,
+        total_credits_purchased=credits,
+        is_active=True,
+        is_verified=True
+    )
+
+    transaction = CreditTransaction(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        amount=credits,
+        transaction_type="bonus",
+        description="Initial test credits",
+        balance_before=0,
+        balance_after=credits
+    )
+
     try:
-        # Check if user already exists
-        existing_user = db.query(User).filter(User.email == email).first()
-        if existing_user:
-            raise HTTPException(400, f"User with email {email} already exists")
-        
-        # Create new user
-        user = User(
-            id=uuid.uuid4(),
-            email=email,
-            username=email.split('@')[0],
-            full_name=f"Test User {email.split('@')[0]}",
-            credits_balance=credits,
-            total_credits_purchased=credits,
-            is_active=True,
-            is_verified=True
-        )
-        
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        
-        # Create initial credit transaction
-        transaction = CreditTransaction(
-            id=uuid.uuid4(),
-            user_id=user.id,
-            amount=credits,
-            transaction_type="bonus",
-            description="Initial test credits",
-            balance_before=0,
-            balance_after=credits
-        )
-        
-        db.add(transaction)
-        db.commit()
-        
-        # Generate JWT token
-        token = auth_service.create_access_token(
-            user_id=str(user.id),
-            expires_delta=timedelta(days=30)  # Long expiry for testing
-        )
-        
-        logger.info(f"Created test user: {email} with {credits} credits")
-        
-        return {
-            "message": "Test user created successfully",
-            "user": {
-                "id": str(user.id),
-                "email": user.email,
-                "credits_balance": user.credits_balance
-            },
-            "access_token": token,
-            "token_type": "bearer",
-            "expires_in": 30 * 24 * 3600  # 30 days
-        }
-        
-    except Exception as e:
-        logger.error(f"Error creating test user: {str(e)}")
-        db.rollback()
-        raise HTTPException(500, f"Failed to create test user: {str(e)}")
+        with db_txn(db):
+            db.add_all([user, transaction])
+    except IntegrityError:
+        # users.email carries a unique index, so the constraint itself is
+        # the duplicate check — no pre-insert EXISTS round trip needed
+        raise HTTPException(400, f"User with email {email} already exists")
+
+    # Generate JWT token
+    token = auth_service.create_access_token(
+        user_id=str(user.id),
+        expires_delta=timedelta(days=30)  # Long expiry for testing
+    )
+
+    logger.info("Created test user: %s with %s credits", email, credits)
+
+    return {
+        "message": "Test user created successfully",
+        "user": {
+            "id": str(user.id),
+            "email": user.email,
+            "credits_balance": user.credits_balance
+        },
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_in": 30 * 24 * 3600  # 30 days
+    }
+
+
+@router.post("/bulk-create-users")
+def bulk_create_test_users(
+    emails: List[str],
+    credits: int = 100,
+    api_key_valid: bool = Depends(verify_api_key),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many test users with initial credits in one transaction.
+
+    Args:
+        emails: User emails to create
+        credits: Initial credits per user (default: 100)
+
+    Returns:
+        dict: Created user ids
+    """
+    # Pre-generate ids so the transaction rows can reference their
+    # users without any flush, then insert both batches via Core
+    # executemany: two INSERT statements and one commit for the whole
+    # seed instead of two commits per user
+    user_rows = []
+    transaction_rows = []
+    for email in emails:
+        user_id = uuid.uuid4()
+        user_rows.append({
+            "id": user_id,
+            "email": email,
+            "username": email.split('@')[0],
+            "full_name": f"Test User {email.split('@')[0]}",
+            "credits_balance": credits,
+            "total_credits_purchased": credits,
+            "is_active": True,
+            "is_verified": True
+        })
+        transaction_rows.append({
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "amount": credits,
+            "transaction_type": "bonus",
+            "description": "Initial test credits",
+            "balance_before": 0,
+            "balance_after": credits
+        })
+
+    try:
+        with db_txn(db):
+            db.execute(_USER_INSERT, user_rows)
+            db.execute(_TRANSACTION_INSERT, transaction_rows)
+    except IntegrityError:
+        raise HTTPException(400, "One or more emails already exist")
+
+    logger.info("Bulk-created %s test users with %s credits each", len(user_rows), credits)
+
+    return {
+        "message": f"Created {len(user_rows)} test users successfully",
+        "user_ids": [str(row["id"]) for row in user_rows]
+    }
 
 
 @router.post("/add-credits")
-async def add_test_credits(
+def add_test_credits(
     user_email: str,
     amount: int,
     api_key_valid: bool = Depends(verify_api_key),
@@ -117,80 +183,90 @@ async def add_test_credits(
     Returns:
         dict: Updated user info
     """
-    try:
-        # Find user
-        user = db.query(User).filter(User.email == user_email).first()
-        if not user:
-            raise HTTPException(404, f"User with email {user_email} not found")
-        
-        # Add credits using credit service
-        credit_service = CreditService(db)
-        success = credit_service.add_credits(
-            user_id=str(user.id),
-            amount=amount,
-            payment_method="test"
-        )
-        
-        if not success:
-            raise HTTPException(500, "Failed to add credits")
-        
-        # Get updated user
-        db.refresh(user)
-        
-        logger.info(f"Added {amount} credits to user: {user_email}")
-        
-        return {
-            "message": f"Added {amount} credits successfully",
-            "user": {
-                "id": str(user.id),
-                "email": user.email,
-                "credits_balance": user.credits_balance,
-                "total_credits_purchased": user.total_credits_purchased
-            }
+    # Find user via the precompiled lookup statement
+    user = db.execute(_USER_BY_EMAIL, {"email": user_email}).scalar_one_or_none()
+    if not user:
+        raise HTTPException(404, f"User with email {user_email} not found")
+
+    # Add credits using credit service (commits internally)
+    credit_service = CreditService(db)
+    success = credit_service.add_credits(
+        user_id=str(user.id),
+        amount=amount,
+        payment_method="test"
+    )
+
+    if not success:
+        raise HTTPException(500, "Failed to add credits")
+
+    logger.info("Added %s credits to user: %s", amount, user_email)
+
+    return {
+        "message": f"Added {amount} credits successfully",
+        "user": {
+            "id": str(user.id),
+            "email": user.email,
+            "credits_balance": user.credits_balance,
+            "total_credits_purchased": user.total_credits_purchased
         }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error adding credits: {str(e)}")
-        raise HTTPException(500, f"Failed to add credits: {str(e)}")
+    }
 
 
 @router.get("/users")
-async def list_test_users(
+def list_test_users(
+    limit: int = 100,
+    cursor: Optional[uuid.UUID] = None,
     api_key_valid: bool = Depends(verify_api_key),
     db: Session = Depends(get_db)
 ):
     """
-    List all test users.
-    
+    List test users, paginated.
+
+    Args:
+        limit: Maximum number of users per page
+        cursor: Pass the next_cursor from the previous page
+
     Returns:
-        list: List of users
+        dict: Page of users plus next_cursor for the following page
     """
-    try:
-        users = db.query(User).all()
-        
-        return {
-            "users": [
-                {
-                    "id": str(user.id),
-                    "email": user.email,
-                    "credits_balance": user.credits_balance,
-                    "total_credits_used": user.total_credits_used,
-                    "is_active": user.is_active,
-                    "created_at": user.created_at.isoformat()
-                }
-                for user in users
-            ]
-        }
-        
-    except Exception as e:
-        logger.error(f"Error listing users: {str(e)}")
-        raise HTTPException(500, f"Failed to list users: {str(e)}")
+    # Select only the serialized columns as plain rows; no ORM
+    # instances or identity-map bookkeeping for a read-only listing
+    stmt = select(
+        User.id,
+        User.email,
+        User.credits_balance,
+        User.total_credits_used,
+        User.is_active,
+        User.created_at,
+    ).order_by(User.id).limit(limit)
+
+    # Keyset pagination: seek past the cursor instead of OFFSET, so a
+    # deep page costs O(limit) and memory stays bounded regardless of
+    # how many users exist
+    if cursor is not None:
+        stmt = stmt.where(User.id > cursor)
+
+    rows = db.execute(stmt).all()
+
+    return {
+        "users": [
+            {
+                "id": str(row.id),
+                "email": row.email,
+                "credits_balance": row.credits_balance,
+                "total_credits_used": row.total_credits_used,
+                "is_active": row.is_active,
+                "created_at": row.created_at.isoformat()
+            }
+            for row in rows
+        ],
+        # rows can be empty when limit=0 or the cursor is past the end
+        "next_cursor": str(rows[-1].id) if rows and len(rows) == limit else None
+    }
 
 
 @router.delete("/user/{user_email}")
-async def delete_test_user(
+def delete_test_user(
     user_email: str,
     api_key_valid: bool = Depends(verify_api_key),
     db: Session = Depends(get_db)
@@ -204,32 +280,29 @@ async def delete_test_user(
     Returns:
         dict: Deletion confirmation
     """
-    try:
-        # Find user
-        user = db.query(User).filter(User.email == user_email).first()
-        if not user:
-            raise HTTPException(404, f"User with email {user_email} not found")
-        
-        # Delete user (cascade will delete related records)
-        db.delete(user)
-        db.commit()
-        
-        logger.info(f"Deleted test user: {user_email}")
-        
-        return {
-            "message": f"User {user_email} deleted successfully"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting user: {str(e)}")
-        db.rollback()
-        raise HTTPException(500, f"Failed to delete user: {str(e)}")
+    # Find user via the precompiled lookup statement
+    user = db.execute(_USER_BY_EMAIL, {"email": user_email}).scalar_one_or_none()
+    if not user:
+        raise HTTPException(404, f"User with email {user_email} not found")
+
+    # Bulk-delete the child transactions and the user row directly in
+    # one transaction; the ORM cascade would load and delete the
+    # transactions one at a time
+    with db_txn(db):
+        db.query(CreditTransaction).filter(
+            CreditTransaction.user_id == user.id
+        ).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+
+    logger.info("Deleted test user: %s", user_email)
+
+    return {
+        "message": f"User {user_email} deleted successfully"
+    }
 
 
 @router.post("/reset-database")
-async def reset_test_database(
+def reset_test_database(
     confirm: bool = False,
     api_key_valid: bool = Depends(verify_api_key),
     db: Session = Depends(get_db)
@@ -246,22 +319,17 @@ async def reset_test_database(
     if not confirm:
         raise HTTPException(400, "Must set confirm=True to reset database")
     
-    try:
-        # Delete all users (cascade will delete related records)
-        deleted_users = db.query(User).delete()
-        db.commit()
-        
-        logger.warning(f"Reset test database: deleted {deleted_users} users")
-        
-        return {
-            "message": f"Database reset successfully. Deleted {deleted_users} users.",
-            "warning": "All test data has been removed."
-        }
-        
-    except Exception as e:
-        logger.error(f"Error resetting database: {str(e)}")
-        db.rollback()
-        raise HTTPException(500, f"Failed to reset database: {str(e)}")
+    # Bulk DELETE without session synchronization: everything is being
+    # discarded, so there's no point paying the per-row ORM sync pass
+    with db_txn(db):
+        deleted_users = db.query(User).delete(synchronize_session=False)
+
+    logger.warning("Reset test database: deleted %s users", deleted_users)
+
+    return {
+        "message": f"Database reset successfully. Deleted {deleted_users} users.",
+        "warning": "All test data has been removed."
+    }
 
 
 @router.get("/info")
@@ -4,9 +4,10 @@ Application Configuration
 Centralized configuration management using Pydantic Settings.
 """
 
-from pydantic import Field, validator
-from pydantic_settings import BaseSettings
-from typing import List, Optional, Dict, Any
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import List, Optional, Dict, Any, FrozenSet
+from functools import cached_property, lru_cache
 import os
 from pathlib import Path
 
@@ -15,72 +16,93 @@ class Settings(BaseSettings):
     """Application settings with environment variable support."""
     
     # API Configuration
-    api_title: str = Field(default="SM Image Processing API", env="API_TITLE")
-    api_version: str = Field(default="1.0.0", env="API_VERSION")
-    debug: bool = Field(default=False, env="DEBUG")
-    environment: str = Field(default="production", env="ENVIRONMENT")
+    api_title: str = Field(default="SM Image Processing API")
+    api_version: str = Field(default="1.0.0")
+    debug: bool = Field(default=False)
+    environment: str = Field(default="production")
     
     # Server Configuration
-    host: str = Field(default="0.0.0.0", env="HOST")
-    port: int = Field(default=8000, env="PORT")
-    workers: int = Field(default=4, env="WORKERS")
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8000)
+    # Default follows the 2*cpu+1 sizing rule; WEB_CONCURRENCY (the
+    # conventional override honored by most process managers) or WORKERS
+    # takes precedence
+    workers: int = Field(
+        default_factory=lambda: max(2, (os.cpu_count() or 1) * 2 + 1),
+        validation_alias=AliasChoices("workers", "web_concurrency")
+    )
     
     # Database Configuration
-    database_url: str = Field(..., env="DATABASE_URL")
-    db_pool_size: int = Field(default=10, env="DB_POOL_SIZE")
-    db_max_overflow: int = Field(default=20, env="DB_MAX_OVERFLOW")
-    db_echo: bool = Field(default=False, env="DB_ECHO")
+    database_url: str = Field(...)
+    # Default pool scales with the host; LIFO checkout keeps the extra
+    # connections cold until a burst actually needs them
+    db_pool_size: int = Field(
+        default_factory=lambda: min(32, (os.cpu_count() or 1) * 5)
+    )
+    db_max_overflow: int = Field(default=20)
+    db_echo: bool = Field(default=False)
     
     # Redis Configuration
-    redis_url: str = Field(..., env="REDIS_URL")
-    redis_max_connections: int = Field(default=10, env="REDIS_MAX_CONNECTIONS")
+    redis_url: str = Field(...)
+    redis_max_connections: int = Field(default=10)
     
     # Security Configuration
-    jwt_secret: str = Field(..., env="JWT_SECRET")
-    jwt_algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
-    jwt_expire_hours: int = Field(default=24, env="JWT_EXPIRE_HOURS")
-    frontend_api_key: str = Field(..., env="FRONTEND_API_KEY")
+    jwt_secret: str = Field(...)
+    jwt_algorithm: str = Field(default="HS256")
+    jwt_expire_hours: int = Field(default=24)
+    frontend_api_key: str = Field(...)
+    api_key_pepper: str = Field(default="")
     
     # Image Processing Configuration
-    max_image_size_mb: int = Field(default=10, env="MAX_IMAGE_SIZE_MB")
-    max_images_per_request: int = Field(default=3, env="MAX_IMAGES_PER_REQUEST")
-    supported_formats: str = Field(default="jpg,jpeg,png,webp", env="SUPPORTED_FORMATS")
+    max_image_size_mb: int = Field(default=10)
+    max_images_per_request: int = Field(default=3)
+    # Stored as the raw CSV string: pydantic-settings JSON-decodes
+    # set-typed fields before any validator runs, so a frozenset
+    # annotation would reject the documented SUPPORTED_FORMATS=jpg,jpeg,...
+    # form at startup. The parsed set lives in supported_formats below.
+    supported_formats_csv: str = Field(
+        default="jpg,jpeg,png,webp",
+        validation_alias=AliasChoices("supported_formats", "supported_formats_csv")
+    )
     
     # AI Model Configuration
-    flux_model_path: str = Field(..., env="FLUX_MODEL_PATH")
-    lora_model_path: str = Field(..., env="LORA_MODEL_PATH")
-    gpu_memory_fraction: float = Field(default=0.9, env="GPU_MEMORY_FRACTION")
-    torch_device: str = Field(default="cuda", env="TORCH_DEVICE")
+    flux_model_path: str = Field(...)
+    lora_model_path: str = Field(...)
+    gpu_memory_fraction: float = Field(default=0.9)
+    torch_device: str = Field(default="cuda")
+    enable_int8: bool = Field(default=False)  # torchao dynamic int8 quantization
+    vram_offload_threshold_gb: int = Field(default=24)  # below this, offload weights to CPU
+    max_batch_size: int = Field(default=4)  # images per pipeline call
     
     # File Storage Configuration
-    storage_type: str = Field(default="local", env="STORAGE_TYPE")  # local, s3, minio
-    storage_path: str = Field(default="/app/storage", env="STORAGE_PATH")
-    storage_url_prefix: str = Field(default="https://api.yourdomain.com/files", env="STORAGE_URL_PREFIX")
+    storage_type: str = Field(default="local")  # local, s3, minio
+    storage_path: str = Field(default="/app/storage")
+    storage_url_prefix: str = Field(default="https://api.yourdomain.com/files")
     
     # S3/MinIO Configuration
-    s3_bucket_name: Optional[str] = Field(default=None, env="S3_BUCKET_NAME")
-    s3_access_key: Optional[str] = Field(default=None, env="S3_ACCESS_KEY")
-    s3_secret_key: Optional[str] = Field(default=None, env="S3_SECRET_KEY")
-    s3_endpoint_url: Optional[str] = Field(default=None, env="S3_ENDPOINT_URL")
-    s3_region: str = Field(default="us-east-1", env="S3_REGION")
+    s3_bucket_name: Optional[str] = Field(default=None)
+    s3_access_key: Optional[str] = Field(default=None)
+    s3_secret_key: Optional[str] = Field(default=None)
+    s3_endpoint_url: Optional[str] = Field(default=None)
+    s3_region: str = Field(default="us-east-1")
     
     # Celery Configuration
-    celery_broker_url: str = Field(..., env="CELERY_BROKER_URL")
-    celery_result_backend: str = Field(..., env="CELERY_RESULT_BACKEND")
-    celery_task_serializer: str = Field(default="json", env="CELERY_TASK_SERIALIZER")
-    celery_result_serializer: str = Field(default="json", env="CELERY_RESULT_SERIALIZER")
+    celery_broker_url: str = Field(...)
+    celery_result_backend: str = Field(...)
+    celery_task_serializer: str = Field(default="msgpack")
+    celery_result_serializer: str = Field(default="msgpack")
     
     # Monitoring Configuration
-    enable_metrics: bool = Field(default=True, env="ENABLE_METRICS")
-    log_level: str = Field(default="INFO", env="LOG_LEVEL")
-    sentry_dsn: Optional[str] = Field(default=None, env="SENTRY_DSN")
+    enable_metrics: bool = Field(default=True)
+    log_level: str = Field(default="INFO")
+    sentry_dsn: Optional[str] = Field(default=None)
     
     # Rate Limiting
-    rate_limit_per_minute: int = Field(default=60, env="RATE_LIMIT_PER_MINUTE")
-    rate_limit_per_hour: int = Field(default=1000, env="RATE_LIMIT_PER_HOUR")
+    rate_limit_per_minute: int = Field(default=60)
+    rate_limit_per_hour: int = Field(default=1000)
     
     # Credit System
-    default_credits: int = Field(default=0, env="DEFAULT_CREDITS")
+    default_credits: int = Field(default=0)
     credit_costs: Dict[str, int] = Field(default_factory=lambda: {
         "enhance_low": 1,
         "enhance_medium": 2,
@@ -90,33 +112,27 @@ class Settings(BaseSettings):
     })
     
     # External Services
-    webhook_timeout: int = Field(default=30, env="WEBHOOK_TIMEOUT")
-    webhook_retry_attempts: int = Field(default=3, env="WEBHOOK_RETRY_ATTEMPTS")
+    webhook_timeout: int = Field(default=30)
+    webhook_retry_attempts: int = Field(default=3)
 
     # Development Settings
-    reload: bool = Field(default=False, env="RELOAD")
-    access_log: bool = Field(default=True, env="ACCESS_LOG")
+    reload: bool = Field(default=False)
+    access_log: bool = Field(default=True)
 
     # Individual Credit Costs (for backward compatibility)
-    credit_costs_enhance_low: int = Field(default=1, env="CREDIT_COSTS_ENHANCE_LOW")
-    credit_costs_enhance_medium: int = Field(default=2, env="CREDIT_COSTS_ENHANCE_MEDIUM")
-    credit_costs_enhance_high: int = Field(default=3, env="CREDIT_COSTS_ENHANCE_HIGH")
-    credit_costs_upscale_2x: int = Field(default=2, env="CREDIT_COSTS_UPSCALE_2X")
-    credit_costs_upscale_4x: int = Field(default=4, env="CREDIT_COSTS_UPSCALE_4X")
-    
-    @validator("supported_formats")
-    def parse_supported_formats(cls, v):
-        """Parse comma-separated formats into a list."""
-        if isinstance(v, str):
-            return [fmt.strip().lower() for fmt in v.split(",")]
-        return v
-    
-    @validator("storage_path")
-    def create_storage_path(cls, v):
-        """Ensure storage path exists."""
-        Path(v).mkdir(parents=True, exist_ok=True)
-        return v
-    
+    credit_costs_enhance_low: int = Field(default=1)
+    credit_costs_enhance_medium: int = Field(default=2)
+    credit_costs_enhance_high: int = Field(default=3)
+    credit_costs_upscale_2x: int = Field(default=2)
+    credit_costs_upscale_4x: int = Field(default=4)
+    
+    @cached_property
+    def supported_formats(self) -> FrozenSet[str]:
+        """Allowed formats parsed into a frozenset for O(1) checks."""
+        return frozenset(
+            fmt.strip().lower() for fmt in self.supported_formats_csv.split(",")
+        )
+
     @property
     def max_image_size_bytes(self) -> int:
         """Convert MB to bytes."""
@@ -132,17 +148,29 @@ class Settings(BaseSettings):
         """Check if running in production mode."""
         return self.environment.lower() in ["production", "prod"]
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
-        validate_assignment = True
-        extra = "ignore"  # Ignore extra fields from .env
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=False,
+        validate_assignment=True,
+        extra="ignore"  # Ignore extra fields from .env
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get application settings (constructed once per process)."""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
 
 
-def get_settings() -> Settings:
-    """Get application settings."""
-    return settings
+def ensure_storage():
+    """Create the storage directory.
+
+    Called explicitly at application startup instead of as a validator
+    side effect, so config parsing (and validate_assignment writes)
+    never touch the filesystem.
+    """
+    Path(settings.storage_path).mkdir(parents=True, exist_ok=True)
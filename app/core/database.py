@@ -4,10 +4,11 @@ Database Configuration and Connection Management
 SQLAlchemy setup with PostgreSQL support and connection pooling.
 """
 
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, text, MetaData
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
 from sqlalchemy.pool import QueuePool
+from contextlib import contextmanager
 from typing import Generator
 import logging
 
@@ -23,16 +24,32 @@ engine = create_engine(
     max_overflow=settings.db_max_overflow,
     pool_pre_ping=True,  # Verify connections before use
     pool_recycle=3600,   # Recycle connections every hour
-    echo=settings.db_echo,  # Log SQL queries in debug mode
+    pool_use_lifo=True,  # Reuse hot connections (warm backend plan cache)
+    pool_timeout=5,      # Fail fast instead of queueing behind a full pool
+    echo=False,  # SQL logging is routed through the logger below instead
 )
 
-# Session factory
+# DB_ECHO routes SQL logging through the standard logging config rather
+# than the engine's echo flag, so the per-statement echo machinery never
+# runs in production where the logger stays at WARNING.
+if settings.db_echo:
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+# Session factory. expire_on_commit=False keeps attributes readable after
+# commit without an implicit re-SELECT per accessed object.
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    expire_on_commit=False,
     bind=engine
 )
 
+# Thread-local session registry for long-lived processes (Celery workers):
+# each worker process reuses one session over the engine's pool instead of
+# constructing a fresh Session per task. Call WorkerSession.remove() when
+# a task finishes.
+WorkerSession = scoped_session(SessionLocal)
+
 # Base class for all models
 Base = declarative_base()
 
@@ -51,20 +68,55 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     except Exception as e:
-        logger.error(f"Database session error: {e}")
+        logger.error("Database session error: %s", e)
         db.rollback()
         raise
     finally:
         db.close()
 
 
+@contextmanager
+def db_txn(db: Session):
+    """
+    Commit-or-rollback scope for endpoint write paths.
+
+    Commits when the body completes, rolls back and re-raises on any
+    error so the registered exception handlers build the response.
+    Centralizes the try/commit/rollback boilerplate the endpoints used
+    to repeat.
+
+    Args:
+        db: Session the transaction runs on
+    """
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def get_session_factory() -> sessionmaker:
+    """
+    Session-factory dependency for FastAPI.
+
+    Unlike get_db, which keeps a pooled connection checked out for the
+    whole request, handlers use the factory as a context manager and
+    return the connection before any post-database work.
+
+    Returns:
+        sessionmaker: Factory producing short-lived sessions
+    """
+    return SessionLocal
+
+
 def create_tables():
     """Create all database tables."""
     try:
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+        logger.error("Error creating database tables: %s", e)
         raise
 
 
@@ -74,7 +126,7 @@ def drop_tables():
         Base.metadata.drop_all(bind=engine)
         logger.warning("All database tables dropped")
     except Exception as e:
-        logger.error(f"Error dropping database tables: {e}")
+        logger.error("Error dropping database tables: %s", e)
         raise
 
 
@@ -86,12 +138,15 @@ def check_db_connection() -> bool:
         bool: True if connection is successful, False otherwise
     """
     try:
+        # text() construct: bare strings are rejected by SQLAlchemy 2.x.
+        # The connection comes from the pool (pool_pre_ping revalidates it),
+        # so this doesn't open a fresh connection per probe.
         with engine.connect() as connection:
-            connection.execute("SELECT 1")
+            connection.execute(text("SELECT 1"))
         logger.info("Database connection successful")
         return True
     except Exception as e:
-        logger.error(f"Database connection failed: {e}")
+        logger.error("Database connection failed: %s", e)
         return False
 
 
@@ -109,7 +164,7 @@ class DatabaseManager:
         try:
             session.close()
         except Exception as e:
-            logger.error(f"Error closing database session: {e}")
+            logger.error("Error closing database session: %s", e)
     
     @staticmethod
     def commit_session(session: Session):
@@ -117,7 +172,7 @@ class DatabaseManager:
         try:
             session.commit()
         except Exception as e:
-            logger.error(f"Error committing database session: {e}")
+            logger.error("Error committing database session: %s", e)
             session.rollback()
             raise
     
@@ -127,7 +182,7 @@ class DatabaseManager:
         try:
             session.rollback()
         except Exception as e:
-            logger.error(f"Error rolling back database session: {e}")
+            logger.error("Error rolling back database session: %s", e)
 
 
 # Global database manager instance
@@ -5,11 +5,13 @@ Centralized exception handling for the SM Image Processing API.
 """
 
 from fastapi import HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from datetime import datetime
 import logging
+
+from app.core.request_context import request_id_var
 from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
@@ -146,116 +148,104 @@ def create_error_response(
     details: Optional[str] = None,
     error_code: Optional[str] = None,
     request_id: Optional[str] = None
-) -> Dict[str, Any]:
-    """Create standardized error response."""
-    
-    error_response = {
-        "error": {
-            "code": error_code or "UNKNOWN_ERROR",
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat(),
-        }
+) -> ORJSONResponse:
+    """Build the standardized error response in one place.
+
+    All four handlers share this single body shape, so the dict is
+    assembled exactly once per error instead of per handler.
+    """
+    error = {
+        "code": error_code or "UNKNOWN_ERROR",
+        "message": message,
+        "timestamp": datetime.utcnow(),  # orjson emits ISO-8601 natively
     }
-    
+
     if details:
-        error_response["error"]["details"] = details
-    
+        error["details"] = details
+
     if request_id:
-        error_response["error"]["request_id"] = request_id
-    
-    return error_response
+        error["request_id"] = request_id
+
+    return ORJSONResponse(status_code=status_code, content={"error": error})
 
 
-async def api_exception_handler(request: Request, exc: APIException) -> JSONResponse:
+async def api_exception_handler(request: Request, exc: APIException) -> ORJSONResponse:
     """Handle custom API exceptions."""
     
-    request_id = getattr(request.state, "request_id", None)
+    request_id = request_id_var.get()
     
     logger.error(
-        f"API Exception: {exc.message}",
+        "API Exception: %s", exc.message,
         extra={
             "status_code": exc.status_code,
             "error_code": exc.error_code,
             "details": exc.details,
-            "request_id": request_id,
             "path": request.url.path,
             "method": request.method
         }
     )
     
-    return JSONResponse(
+    return create_error_response(
         status_code=exc.status_code,
-        content=create_error_response(
-            status_code=exc.status_code,
-            message=exc.message,
-            details=exc.details,
-            error_code=exc.error_code,
-            request_id=request_id
-        )
+        message=exc.message,
+        details=exc.details,
+        error_code=exc.error_code,
+        request_id=request_id
     )
 
 
-async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> JSONResponse:
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> ORJSONResponse:
     """Handle HTTP exceptions."""
     
-    request_id = getattr(request.state, "request_id", None)
+    request_id = request_id_var.get()
     
     logger.warning(
-        f"HTTP Exception: {exc.detail}",
+        "HTTP Exception: %s", exc.detail,
         extra={
             "status_code": exc.status_code,
-            "request_id": request_id,
             "path": request.url.path,
             "method": request.method
         }
     )
     
-    return JSONResponse(
+    return create_error_response(
         status_code=exc.status_code,
-        content=create_error_response(
-            status_code=exc.status_code,
-            message=exc.detail,
-            error_code="HTTP_ERROR",
-            request_id=request_id
-        )
+        message=exc.detail,
+        error_code="HTTP_ERROR",
+        request_id=request_id
     )
 
 
-async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+async def validation_exception_handler(request: Request, exc: RequestValidationError) -> ORJSONResponse:
     """Handle request validation errors."""
     
-    request_id = getattr(request.state, "request_id", None)
+    request_id = request_id_var.get()
     
     logger.warning(
-        f"Validation Error: {exc.errors()}",
+        "Validation Error: %s", exc.errors(),
         extra={
-            "request_id": request_id,
             "path": request.url.path,
             "method": request.method
         }
     )
     
-    return JSONResponse(
+    return create_error_response(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content=create_error_response(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            message="Request validation failed",
-            details=str(exc.errors()),
-            error_code="VALIDATION_ERROR",
-            request_id=request_id
-        )
+        message="Request validation failed",
+        details=str(exc.errors()),
+        error_code="VALIDATION_ERROR",
+        request_id=request_id
     )
 
 
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def general_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
     """Handle unexpected exceptions."""
     
-    request_id = getattr(request.state, "request_id", None)
+    request_id = request_id_var.get()
     
     logger.error(
-        f"Unexpected error: {str(exc)}",
+        "Unexpected error: %s", exc,
         extra={
-            "request_id": request_id,
             "path": request.url.path,
             "method": request.method,
             "exception_type": type(exc).__name__
@@ -263,13 +253,10 @@ async def general_exception_handler(request: Request, exc: Exception) -> JSONRes
         exc_info=True
     )
     
-    return JSONResponse(
+    return create_error_response(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content=create_error_response(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            message="Internal server error",
-            details="An unexpected error occurred. Please try again later.",
-            error_code="INTERNAL_ERROR",
-            request_id=request_id
-        )
+        message="Internal server error",
+        details="An unexpected error occurred. Please try again later.",
+        error_code="INTERNAL_ERROR",
+        request_id=request_id
     )
@@ -0,0 +1,21 @@
+"""
+Request Context
+
+Request-scoped correlation id propagated through contextvars, so any
+logger or service can read it without carrying the Request object
+around or touching request.state.
+"""
+
+from contextvars import ContextVar
+import logging
+
+# Bound by the observability middleware for the lifetime of one request
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+
+
+class RequestIDLogFilter(logging.Filter):
+    """Stamp the current request id onto every log record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
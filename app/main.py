@@ -5,17 +5,22 @@ Main FastAPI application entry point.
 """
 
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from contextlib import asynccontextmanager
+import asyncio
 import logging
-import uuid
+import time
 from datetime import datetime
 
-from app.core.config import settings
+from app.core.config import settings, ensure_storage
+from app.core.fast_uuid import fast_uuid_str
+from app.core.request_context import request_id_var, RequestIDLogFilter
 from app.core.database import create_tables, check_db_connection
+from app.api.v1.dependencies import last_login_tracker
 from app.core.exceptions import (
     APIException,
     api_exception_handler,
@@ -25,20 +30,31 @@ from app.core.exceptions import (
 )
 from app.api.v1.endpoints import health, auth, images
 
-# Configure logging
+# Configure logging; every record carries the current request id via
+# the contextvar-backed filter
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper()),
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
 )
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(RequestIDLogFilter())
 logger = logging.getLogger(__name__)
 
+# Skip per-record thread/process lookups; we never log those fields
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
     logger.info("Starting SM Image Processing API...")
-    
+
+    # Ensure the storage directory exists
+    ensure_storage()
+
     # Check database connection
     if not check_db_connection():
         logger.error("Database connection failed!")
@@ -49,15 +65,24 @@ async def lifespan(app: FastAPI):
         create_tables()
         logger.info("Database tables created/verified")
     except Exception as e:
-        logger.error(f"Database table creation failed: {e}")
+        logger.error("Database table creation failed: %s", e)
         raise
     
+    # Start the write-behind flusher for last_login updates
+    last_login_task = asyncio.create_task(last_login_tracker.run())
+
     logger.info("API startup completed successfully")
-    
+
     yield
-    
+
     # Shutdown
     logger.info("Shutting down SM Image Processing API...")
+    last_login_task.cancel()
+    try:
+        await last_login_task
+    except asyncio.CancelledError:
+        pass
+    await last_login_tracker.flush()
 
 
 # Create FastAPI application
@@ -68,6 +93,7 @@ app = FastAPI(
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
     openapi_url="/openapi.json" if settings.debug else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -80,57 +106,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip for JSON routes only.
 
+    Result downloads are JPEGs, which are already entropy-coded; gzip
+    spends a full pass over the body to produce slightly larger output,
+    so those paths bypass compression entirely.
+    """
 
-@app.middleware("http")
-async def add_request_id_middleware(request: Request, call_next):
-    """Add unique request ID to each request."""
-    request_id = str(uuid.uuid4())
-    request.state.request_id = request_id
-    
-    # Add request ID to response headers
-    response = await call_next(request)
-    response.headers["X-Request-ID"] = request_id
-    
-    return response
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/api/v1/images/download/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
 
-@app.middleware("http")
-async def log_requests_middleware(request: Request, call_next):
-    """Log all requests."""
-    start_time = datetime.utcnow()
-    
-    # Log request
-    logger.info(
-        f"Request started",
-        extra={
-            "request_id": getattr(request.state, "request_id", None),
-            "method": request.method,
-            "url": str(request.url),
-            "client_ip": request.client.host if request.client else None,
-        }
-    )
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Calculate duration
-    duration = (datetime.utcnow() - start_time).total_seconds()
-    
-    # Log response
-    logger.info(
-        f"Request completed",
-        extra={
-            "request_id": getattr(request.state, "request_id", None),
-            "method": request.method,
-            "url": str(request.url),
-            "status_code": response.status_code,
-            "duration_seconds": duration,
-        }
-    )
-    
-    return response
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1000)
+
+
+class ObservabilityMiddleware:
+    """Request id, timing, and access logging in one ASGI pass.
+
+    A single pure ASGI layer instead of separate request-id and logging
+    middlewares: one coroutine frame, one send wrapper, and one access
+    log line per request.
+    """
+
+    # Documentation endpoints log at DEBUG to keep INFO clean
+    QUIET_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Liveness/readiness probes fire every few seconds; skip id
+        # generation, timing, and logging entirely for them
+        probe_path = scope["path"]
+        if probe_path == "/api/v1/health" or probe_path.startswith("/api/v1/health/"):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        request_id = fast_uuid_str()
+        # Bound for the request's lifetime; loggers and the exception
+        # handlers read it from the contextvar instead of request.state
+        token = request_id_var.set(request_id)
+        request_id_header = request_id.encode("latin-1")
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"].append((b"x-request-id", request_id_header))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            path = scope["path"]
+            level = logging.DEBUG if path.startswith(self.QUIET_PATHS) else logging.INFO
+            logger.log(
+                level,
+                "%s %s %d %.2fms",
+                scope["method"], path, status_code, duration_ms
+            )
+            request_id_var.reset(token)
+
+
+app.add_middleware(ObservabilityMiddleware)
 
 
 # Add exception handlers
@@ -158,7 +207,7 @@ async def root():
         "message": "SM Image Processing API",
         "version": settings.api_version,
         "status": "operational",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": datetime.utcnow(),  # orjson serializes datetimes natively
         "docs_url": "/docs" if settings.debug else None
     }
 
@@ -179,7 +228,7 @@ async def api_info():
         "limits": {
             "max_images_per_request": settings.max_images_per_request,
             "max_image_size_mb": settings.max_image_size_mb,
-            "supported_formats": settings.supported_formats
+            "supported_formats": sorted(settings.supported_formats)
         },
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -194,5 +243,11 @@ if __name__ == "__main__":
         port=settings.port,
         reload=settings.debug,
         workers=1 if settings.debug else settings.workers,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        # uvicorn[standard] extras: uvloop event loop and httptools parser
+        # are significantly faster than the asyncio/h11 defaults
+        loop="uvloop",
+        http="httptools",
+        proxy_headers=True,
+        forwarded_allow_ips="*"
     )
@@ -4,18 +4,38 @@ Credit Service
 Service for managing user credits, transactions, and billing.
 """
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
-import uuid
+import redis
 
 from app.models.database import User, CreditTransaction
+from app.core.fast_uuid import fast_uuid7
 from app.core.config import settings
 from app.core.exceptions import InsufficientCreditsError
 
 logger = logging.getLogger(__name__)
 
+# Balance cache TTL; every mutation writes through, so the TTL only
+# bounds staleness if a write from another process slips past us
+_BALANCE_TTL = 300
+
+_balance_redis = None
+
+
+def _balance_cache() -> redis.Redis:
+    """Lazily build the shared sync Redis client for balance lookups."""
+    global _balance_redis
+    if _balance_redis is None:
+        _balance_redis = redis.Redis.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            decode_responses=True
+        )
+    return _balance_redis
+
 
 class CreditService:
     """Service for managing user credits and transactions."""
@@ -23,7 +43,24 @@ class CreditService:
     def __init__(self, db: Session):
         self.db = db
         self.credit_costs = settings.credit_costs
+        # Flat lookup tables built once: calculate_cost runs on every
+        # submission and should not construct f-string keys per call
+        self._enhance_costs = {
+            quality: self.credit_costs.get(f"enhance_{quality}", 2)
+            for quality in ("low", "medium", "high", "ultra")
+        }
+        self._upscale_costs = {
+            factor: self.credit_costs.get(f"upscale_{factor}x", 2)
+            for factor in (2, 3, 4, 8)
+        }
     
+    def _cache_balance(self, user_id: str, balance: int):
+        """Write the committed balance through to Redis (best effort)."""
+        try:
+            _balance_cache().setex(f"bal:{user_id}", _BALANCE_TTL, balance)
+        except Exception as e:
+            logger.warning("Balance cache write failed for user %s: %s", user_id, e)
+
     def calculate_cost(self, operation: str, parameters: Dict[str, Any], image_count: int) -> int:
         """
         Calculate the cost of an image processing operation.
@@ -36,32 +73,25 @@ class CreditService:
         Returns:
             int: Total cost in credits
         """
-        try:
-            base_cost = 1  # Default cost
-            
-            if operation == "enhance":
-                quality = parameters.get("quality", "medium")
-                base_cost = self.credit_costs.get(f"enhance_{quality}", 2)
-            
-            elif operation == "upscale":
-                upscale_factor = parameters.get("upscale_factor", 2)
-                base_cost = self.credit_costs.get(f"upscale_{upscale_factor}x", 2)
-            
-            # Apply multipliers for advanced parameters
-            if parameters.get("steps", 20) > 50:
-                base_cost = int(base_cost * 1.5)  # 50% more for high step count
-            
-            if parameters.get("guidance_scale", 7.5) > 15:
-                base_cost = int(base_cost * 1.2)  # 20% more for high guidance
-            
-            total_cost = base_cost * image_count
-            
-            logger.info(f"Cost calculated: {operation} x{image_count} = {total_cost} credits")
-            return total_cost
-            
-        except Exception as e:
-            logger.error(f"Error calculating cost: {str(e)}")
-            return 2 * image_count  # Fallback cost
+        base_cost = 1  # Default cost
+
+        if operation == "enhance":
+            base_cost = self._enhance_costs.get(parameters.get("quality", "medium"), 2)
+
+        elif operation == "upscale":
+            base_cost = self._upscale_costs.get(parameters.get("upscale_factor", 2), 2)
+
+        # Apply multipliers for advanced parameters
+        if parameters.get("steps", 20) > 50:
+            base_cost = int(base_cost * 1.5)  # 50% more for high step count
+
+        if parameters.get("guidance_scale", 7.5) > 15:
+            base_cost = int(base_cost * 1.2)  # 20% more for high guidance
+
+        total_cost = base_cost * image_count
+
+        logger.info("Cost calculated: %s x%s = %s credits", operation, image_count, total_cost)
+        return total_cost
     
     def check_user_credits(self, user_id: str, required_credits: int) -> bool:
         """
@@ -74,65 +104,65 @@ class CreditService:
         Returns:
             bool: True if user has sufficient credits
         """
-        try:
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
-                return False
-            
-            return user.credits_balance >= required_credits
-            
-        except Exception as e:
-            logger.error(f"Error checking user credits: {str(e)}")
-            return False
+        balance = self.get_user_credits(user_id)
+        return balance is not None and balance >= required_credits
     
-    def check_and_reserve_credits(self, user_id: str, required_credits: int) -> bool:
+    def check_and_reserve_credits(self, user_id: str, required_credits: int) -> Optional[int]:
         """
         Check and reserve credits for a processing job.
-        
+
         Args:
             user_id: User identifier
             required_credits: Required credits amount
-            
+
         Returns:
-            bool: True if credits were successfully reserved
+            Optional[int]: New credit balance after reservation, or None if
+                the user was not found or had insufficient credits
         """
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
-                logger.warning(f"User not found: {user_id}")
-                return False
-            
-            if user.credits_balance < required_credits:
-                logger.warning(f"Insufficient credits for user {user_id}: {user.credits_balance} < {required_credits}")
-                return False
-            
-            # Reserve credits by deducting from balance
-            balance_before = user.credits_balance
-            user.credits_balance -= required_credits
-            user.total_credits_used += required_credits
-            user.updated_at = datetime.utcnow()
-            
-            # Create transaction record
+            # Single conditional UPDATE: the balance check and the debit
+            # happen atomically in the database, so concurrent requests
+            # cannot both pass a read-then-write check. No prior SELECT.
+            stmt = update(User).where(
+                User.id == user_id,
+                User.credits_balance >= required_credits
+            ).values(
+                credits_balance=User.credits_balance - required_credits,
+                total_credits_used=User.total_credits_used + required_credits,
+                updated_at=datetime.utcnow()
+            ).returning(User.credits_balance)
+
+            new_balance = self.db.execute(
+                stmt, execution_options={"synchronize_session": False}
+            ).scalar_one_or_none()
+
+            if new_balance is None:
+                logger.warning(f"User {user_id} not found or has insufficient credits (< {required_credits})")
+                self.db.rollback()
+                return None
+
+            # Record the transaction in the same database transaction
             transaction = CreditTransaction(
-                id=uuid.uuid4(),
-                user_id=user.id,
+                id=fast_uuid7(),
+                user_id=user_id,
                 amount=-required_credits,
                 transaction_type="usage",
                 description=f"Credits reserved for image processing",
-                balance_before=balance_before,
-                balance_after=user.credits_balance
+                balance_before=new_balance + required_credits,
+                balance_after=new_balance
             )
-            
+
             self.db.add(transaction)
             self.db.commit()
-            
+            self._cache_balance(user_id, new_balance)
+
             logger.info(f"Reserved {required_credits} credits for user {user_id}")
-            return True
-            
+            return new_balance
+
         except Exception as e:
             logger.error(f"Error reserving credits: {str(e)}")
             self.db.rollback()
-            return False
+            return None
     
     def refund_credits(self, user_id: str, amount: int, reason: str) -> bool:
         """
@@ -147,29 +177,39 @@ class CreditService:
             bool: True if refund was successful
         """
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
+            # Credit the balance in place; RETURNING gives the new value
+            # without a separate SELECT
+            stmt = update(User).where(
+                User.id == user_id
+            ).values(
+                credits_balance=User.credits_balance + amount,
+                total_credits_used=User.total_credits_used - amount,
+                updated_at=datetime.utcnow()
+            ).returning(User.credits_balance)
+
+            new_balance = self.db.execute(
+                stmt, execution_options={"synchronize_session": False}
+            ).scalar_one_or_none()
+
+            if new_balance is None:
                 logger.warning(f"User not found for refund: {user_id}")
+                self.db.rollback()
                 return False
-            
-            balance_before = user.credits_balance
-            user.credits_balance += amount
-            user.total_credits_used -= amount
-            user.updated_at = datetime.utcnow()
-            
+
             # Create refund transaction
             transaction = CreditTransaction(
-                id=uuid.uuid4(),
-                user_id=user.id,
+                id=fast_uuid7(),
+                user_id=user_id,
                 amount=amount,
                 transaction_type="refund",
                 description=reason,
-                balance_before=balance_before,
-                balance_after=user.credits_balance
+                balance_before=new_balance - amount,
+                balance_after=new_balance
             )
             
             self.db.add(transaction)
             self.db.commit()
+            self._cache_balance(user_id, new_balance)
             
             logger.info(f"Refunded {amount} credits to user {user_id}: {reason}")
             return True
@@ -193,32 +233,41 @@ class CreditService:
             bool: True if credits were added successfully
         """
         try:
-            user = self.db.query(User).filter(User.id == user_id).first()
-            if not user:
+            # Same atomic UPDATE ... RETURNING pattern as reservation
+            stmt = update(User).where(
+                User.id == user_id
+            ).values(
+                credits_balance=User.credits_balance + amount,
+                total_credits_purchased=User.total_credits_purchased + amount,
+                updated_at=datetime.utcnow()
+            ).returning(User.credits_balance)
+
+            new_balance = self.db.execute(
+                stmt, execution_options={"synchronize_session": False}
+            ).scalar_one_or_none()
+
+            if new_balance is None:
                 logger.warning(f"User not found for credit addition: {user_id}")
+                self.db.rollback()
                 return False
             
-            balance_before = user.credits_balance
-            user.credits_balance += amount
-            user.total_credits_purchased += amount
-            user.updated_at = datetime.utcnow()
-            
             # Create purchase transaction
             transaction = CreditTransaction(
-                id=uuid.uuid4(),
-                user_id=user.id,
+                id=fast_uuid7(),
+                user_id=user_id,
                 amount=amount,
                 transaction_type="purchase",
                 description=f"Credits purchased via {payment_method or 'unknown'}",
                 payment_id=payment_id,
                 payment_method=payment_method,
                 payment_status="completed",
-                balance_before=balance_before,
-                balance_after=user.credits_balance
+                balance_before=new_balance - amount,
+                balance_after=new_balance
             )
             
             self.db.add(transaction)
             self.db.commit()
+            self._cache_balance(user_id, new_balance)
             
             logger.info(f"Added {amount} credits to user {user_id} via {payment_method}")
             return True
@@ -238,9 +287,21 @@ class CreditService:
         Returns:
             Optional[int]: User's credit balance or None if user not found
         """
+        # Redis first: balance only changes through this service, which
+        # writes every mutation through, so a hit skips the DB round trip
+        try:
+            cached = _balance_cache().get(f"bal:{user_id}")
+            if cached is not None:
+                return int(cached)
+        except Exception as e:
+            logger.warning("Balance cache read failed for user %s: %s", user_id, e)
+
         try:
             user = self.db.query(User).filter(User.id == user_id).first()
-            return user.credits_balance if user else None
+            if not user:
+                return None
+            self._cache_balance(user_id, user.credits_balance)
+            return user.credits_balance
             
         except Exception as e:
             logger.error(f"Error getting user credits: {str(e)}")
@@ -24,15 +24,18 @@ celery_app = Celery(
 celery_app.conf.update(
     task_serializer=settings.celery_task_serializer,
     result_serializer=settings.celery_result_serializer,
-    accept_content=["json"],
+    # msgpack payloads are much cheaper to pack/unpack than JSON for the
+    # nested request dicts; json stays accepted for in-flight tasks
+    accept_content=["msgpack", "json"],
     result_expires=3600,  # Results expire after 1 hour
     timezone="UTC",
     enable_utc=True,
     
     # Task routing
+    # Keys must match the explicit task names the workers register
     task_routes={
-        "app.workers.image_worker.process_images_task": {"queue": "image_processing"},
-        "app.workers.image_worker.cleanup_job_task": {"queue": "cleanup"},
+        "process_images_task": {"queue": "image_processing"},
+        "cleanup_job_task": {"queue": "cleanup"},
     },
     
     # Worker configuration
@@ -55,12 +58,12 @@ celery_app.conf.update(
 
 # Task annotations for specific configurations
 celery_app.conf.task_annotations = {
-    "app.workers.image_worker.process_images_task": {
+    "process_images_task": {
         "rate_limit": "10/m",  # 10 tasks per minute
         "time_limit": 600,     # 10 minutes
         "soft_time_limit": 300, # 5 minutes
     },
-    "app.workers.image_worker.cleanup_job_task": {
+    "cleanup_job_task": {
         "rate_limit": "100/m",  # 100 cleanup tasks per minute
         "time_limit": 60,       # 1 minute
     },
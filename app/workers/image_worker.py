@@ -5,26 +5,102 @@ Celery worker for processing images using Flux Kontext and LoRA models.
 """
 
 import os
+import re
+import shutil
 import time
 import logging
 import traceback
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+# Must be set before torch initializes CUDA: expandable segments let the
+# caching allocator grow/shrink regions instead of fragmenting around the
+# variable-resolution allocations upscale jobs produce
+os.environ.setdefault(
+    "PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512"
+)
+
+import httpx
 import torch
 from PIL import Image
 import base64
+import binascii
 import io
 import numpy as np
 
+from celery.signals import worker_process_init
+
 from app.workers.celery_app import celery_app
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.database import WorkerSession
 from app.services.image_service import ImageService
 
+# Imported at module top so a missing/broken install fails at worker
+# start, not on the first job; the worker is useless without diffusers
+# anyway, but keep the module importable for tooling
+try:
+    from diffusers import FluxPipeline
+except ImportError:
+    FluxPipeline = None
+
+# Optional fast decoders; PIL remains the fallback for everything
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
+    _turbo = TurboJPEG()
+except Exception:
+    _turbo = None
+
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
 logger = logging.getLogger(__name__)
 
+# The worker only ever runs inference; disabling autograd globally frees
+# the grad-graph bookkeeping and roughly halves activation memory
+torch.set_grad_enabled(False)
+
+# Data-URL prefix, stripped once per payload instead of startswith+split
+_DATA_URL_RE = re.compile(r"^data:image/[^;]+;base64,")
+
+# PIL releases the GIL while decoding JPEG/PNG, so decodes parallelize
+_DECODE_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+
+def _decode_image(image_data: str) -> Image.Image:
+    """Decode one base64 payload to an RGB PIL image."""
+    # a2b_base64 is the C primitive under base64.b64decode, minus the
+    # Python-level wrapping; it releases the GIL so pool decodes overlap
+    img_bytes = binascii.a2b_base64(_DATA_URL_RE.sub("", image_data, count=1))
+
+    # Route by magic bytes: libjpeg-turbo decodes JPEG 2-4x faster than
+    # PIL and cv2 beats it on PNG; both return RGB-ready arrays
+    if _turbo is not None and img_bytes[:3] == b"\xff\xd8\xff":
+        try:
+            return Image.fromarray(_turbo.decode(img_bytes, pixel_format=TJPF_RGB))
+        except Exception:
+            pass
+    if cv2 is not None and img_bytes[:4] == b"\x89PNG":
+        try:
+            arr = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+            if arr is not None:
+                return Image.fromarray(arr[:, :, ::-1])  # BGR -> RGB
+        except Exception:
+            pass
+
+    image = Image.open(io.BytesIO(img_bytes))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def decode_images(image_datas: List[str]) -> List[Image.Image]:
+    """Decode a batch of base64 payloads on the shared thread pool."""
+    return list(_DECODE_POOL.map(_decode_image, image_datas))
+
 
 class FluxImageProcessor:
     """Image processor using Flux Kontext and LoRA models."""
@@ -34,7 +110,10 @@ class FluxImageProcessor:
         self.device = self._detect_device()
         self.flux_pipe = None
         self.lora_pipe = None
+        self.torch_dtype = torch.float32
         self.model_loaded = False
+        self._needs_offload = False
+        self._gen = None
         self.use_cpu_fallback = self.device == "cpu"
 
         logger.info(f"Initialized FluxImageProcessor with device: {self.device}")
@@ -75,30 +154,45 @@ class FluxImageProcessor:
             if not os.path.exists(settings.flux_model_path):
                 raise FileNotFoundError(f"Flux model not found at: {settings.flux_model_path}")
 
-            # Import diffusers components
-            from diffusers import FluxPipeline, DiffusionPipeline
+            if FluxPipeline is None:
+                raise ImportError("diffusers is not installed")
 
             # Configure model loading based on device
             if self.device == "cpu":
                 logger.info("Loading model for CPU inference...")
+                self.torch_dtype = torch.float32
                 self.flux_pipe = FluxPipeline.from_pretrained(
                     settings.flux_model_path,
-                    torch_dtype=torch.float32,  # Use float32 for CPU
+                    torch_dtype=self.torch_dtype,
                     device_map=None,
-                    low_cpu_mem_usage=True
+                    low_cpu_mem_usage=True,
+                    use_safetensors=True  # mmap weights, fault pages on demand
                 )
                 self.flux_pipe.to("cpu")
             else:
                 logger.info("Loading model for GPU inference...")
-                # Determine appropriate dtype based on GPU memory
-                torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+                # bfloat16 on Ampere+ (compute capability >= 8): same exponent
+                # range as fp32, so no overflow/black-image artifacts, and
+                # faster Tensor Core throughput than fp16. Older GPUs keep fp16.
+                if torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8:
+                    self.torch_dtype = torch.bfloat16
+                else:
+                    self.torch_dtype = torch.float16
 
                 self.flux_pipe = FluxPipeline.from_pretrained(
                     settings.flux_model_path,
-                    torch_dtype=torch_dtype,
-                    device_map="auto" if torch.cuda.is_available() else None
+                    torch_dtype=self.torch_dtype,
+                    device_map="auto" if torch.cuda.is_available() else None,
+                    use_safetensors=True  # mmap weights, fault pages on demand
                 )
-                self.flux_pipe.to(self.device)
+                try:
+                    self.flux_pipe.to(self.device)
+                except torch.cuda.OutOfMemoryError:
+                    # Model doesn't fit resident; _apply_optimizations will
+                    # fall back to CPU offload
+                    logger.warning("Model does not fit in VRAM, enabling CPU offload")
+                    self._needs_offload = True
+                    torch.cuda.empty_cache()
 
             # Load LoRA model for upscaling if available
             if os.path.exists(settings.lora_model_path):
@@ -111,6 +205,13 @@ class FluxImageProcessor:
             # Apply optimizations based on device
             self._apply_optimizations()
 
+            # One persistent generator per process; reseeded per request
+            # instead of rebuilding RNG state for every image
+            self._gen = torch.Generator(device=self.device)
+
+            if self.device == "cuda":
+                self._warmup()
+
             self.model_loaded = True
             logger.info(f"Models loaded successfully on {self.device}")
 
@@ -137,32 +238,177 @@ class FluxImageProcessor:
             else:
                 # GPU optimizations
                 logger.info("Applying GPU optimizations...")
-                if hasattr(self.flux_pipe, 'enable_model_cpu_offload'):
-                    self.flux_pipe.enable_model_cpu_offload()
 
-                if hasattr(self.flux_pipe, 'enable_attention_slicing'):
-                    self.flux_pipe.enable_attention_slicing()
+                # Let SDPA pick the FlashAttention / mem-efficient kernel:
+                # one fused kernel instead of materializing the O(N^2)
+                # attention matrix in HBM. These are the process-wide
+                # setters; sdp_kernel() is a context manager and does
+                # nothing when called bare.
+                torch.backends.cuda.enable_flash_sdp(True)
+                torch.backends.cuda.enable_mem_efficient_sdp(True)
+                torch.backends.cuda.enable_math_sdp(False)
+                # TF32 MatMuls/convs and cudnn autotuning are free accuracy
+                # trade-offs for diffusion inference
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
+                torch.backends.cudnn.benchmark = True
+
+                # CPU offload streams weights over PCIe every step and
+                # attention slicing serializes the attention math — both are
+                # out-of-memory workarounds, not free optimizations. Keep
+                # weights resident whenever the card has room.
+                total_vram_gb = torch.cuda.get_device_properties(0).total_memory / 1024**3
+                use_offload = (
+                    self._needs_offload
+                    or total_vram_gb < settings.vram_offload_threshold_gb
+                )
+                if use_offload:
+                    logger.info(f"Low VRAM ({total_vram_gb:.0f} GB), enabling CPU offload")
+                    if hasattr(self.flux_pipe, 'enable_model_cpu_offload'):
+                        self.flux_pipe.enable_model_cpu_offload()
 
-                if hasattr(self.flux_pipe, 'enable_xformers_memory_efficient_attention'):
+                    if hasattr(self.flux_pipe, 'enable_attention_slicing'):
+                        self.flux_pipe.enable_attention_slicing()
+                else:
+                    logger.info(f"{total_vram_gb:.0f} GB VRAM, keeping weights resident")
+
+                # NHWC layout feeds the Tensor-Core conv kernels directly
+                # instead of transposing around every convolution; the
+                # conv-heavy VAE decode after each run benefits most
+                if torch.cuda.get_device_capability()[0] >= 8:
+                    try:
+                        self.flux_pipe.vae.to(memory_format=torch.channels_last)
+                        if hasattr(self.flux_pipe, "unet"):
+                            self.flux_pipe.unet.to(memory_format=torch.channels_last)
+                        logger.info("Converted conv modules to channels_last")
+                    except Exception as e:
+                        logger.warning(f"Could not convert to channels_last: {e}")
+
+                # Pre-Ampere GPUs miss the flash kernel; xformers is the
+                # fallback there. On capability >= 8 SDPA is both faster and
+                # one dependency fewer.
+                if torch.cuda.get_device_capability()[0] < 8:
+                    if hasattr(self.flux_pipe, 'enable_xformers_memory_efficient_attention'):
+                        try:
+                            self.flux_pipe.enable_xformers_memory_efficient_attention()
+                            logger.info("Enabled xformers memory efficient attention")
+                        except Exception as e:
+                            logger.warning(f"Could not enable xformers: {e}")
+
+                # One wide QKV GEMM per attention block instead of three
+                # narrow ones; done before compile so the fused shape is
+                # what gets traced
+                try:
+                    if hasattr(self.flux_pipe, "fuse_qkv_projections"):
+                        self.flux_pipe.fuse_qkv_projections()
+                        logger.info("Fused QKV projections")
+                    elif hasattr(getattr(self.flux_pipe, "transformer", None), "fuse_qkv_projections"):
+                        self.flux_pipe.transformer.fuse_qkv_projections()
+                        logger.info("Fused QKV projections on transformer")
+                except Exception as e:
+                    logger.warning(f"Could not fuse QKV projections: {e}")
+
+                # Optional dynamic int8 quantization of the transformer's
+                # linear layers: halves weight bandwidth on Ampere+ INT8
+                # Tensor Cores. Opt-in via ENABLE_INT8 and only meaningful
+                # on top of the bf16 path.
+                if (
+                    settings.enable_int8
+                    and self.torch_dtype == torch.bfloat16
+                    and hasattr(self.flux_pipe, "transformer")
+                ):
+                    try:
+                        from torchao.quantization import apply_dynamic_quant
+                        apply_dynamic_quant(self.flux_pipe.transformer)
+                        torch._inductor.config.force_fuse_int_mm_with_mul = True
+                        logger.info("Applied dynamic int8 quantization to transformer")
+                    except Exception as e:
+                        logger.warning(f"Could not apply int8 quantization: {e}")
+
+                # Compile the transformer and VAE decoder: fuses pointwise
+                # ops and lets inductor capture the fixed per-step kernel
+                # sequence as CUDA graphs (max-autotune and reduce-overhead
+                # both enable cudagraph replay), so the 20-step denoising
+                # loop replays with one launch per step instead of dozens.
+                # Skipped under CPU offload — weights move between devices
+                # mid-step there, which graph capture can't represent.
+                if not use_offload:
                     try:
-                        self.flux_pipe.enable_xformers_memory_efficient_attention()
-                        logger.info("Enabled xformers memory efficient attention")
+                        if hasattr(self.flux_pipe, "transformer"):
+                            self.flux_pipe.transformer = torch.compile(
+                                self.flux_pipe.transformer,
+                                mode="max-autotune",
+                                fullgraph=False
+                            )
+                        if hasattr(self.flux_pipe, "vae"):
+                            self.flux_pipe.vae.decode = torch.compile(
+                                self.flux_pipe.vae.decode,
+                                mode="reduce-overhead"
+                            )
+                        logger.info("Compiled transformer and VAE decoder")
                     except Exception as e:
-                        logger.warning(f"Could not enable xformers: {e}")
+                        logger.warning(f"torch.compile unavailable, staying eager: {e}")
 
         except Exception as e:
             logger.warning(f"Error applying optimizations: {e}")
+
+    def _warmup(self):
+        """Run one dummy inference so compilation happens at load time.
+
+        torch.compile traces and autotunes on first call; doing it here
+        means the first user request doesn't pay the multi-minute
+        compile cost.
+        """
+        try:
+            logger.info("Warming up pipeline...")
+            dummy = Image.new("RGB", (512, 512))
+            self.enhance_image(dummy, {"steps": 1, "guidance_scale": 7.5})
+            logger.info("Pipeline warmup complete")
+        except Exception as e:
+            logger.warning(f"Pipeline warmup failed: {e}")
     
-    def enhance_image(self, image: Image.Image, parameters: Dict[str, Any]) -> Image.Image:
+    def _seeded_generator(self, seed) -> torch.Generator:
+        """Reseed the shared generator for one pipeline call.
+
+        torch.manual_seed / np.random.seed mutate process-global RNG
+        state and serialize across threads; a dedicated generator keeps
+        determinism scoped to the call that asked for it.
         """
-        Enhance image quality using Flux.
-        
+        gen = self._gen
+        if gen is None:
+            gen = self._gen = torch.Generator(device=self.device)
+        if seed is not None:
+            gen.manual_seed(seed)
+        else:
+            gen.seed()
+        return gen
+
+    def _to_device_batch(self, images: List[Image.Image]):
+        """Stack PIL images into a pinned tensor and upload it asynchronously.
+
+        Pinned host memory lets the H2D copy run on a DMA engine, so the
+        transfer overlaps with the first diffusion step instead of
+        serializing in front of it. Values are left in [0, 1]; the
+        pipeline's image processor applies its own normalization.
+        """
+        if self.device != "cuda":
+            return images
+        arr = np.stack([np.asarray(img, dtype=np.float32) for img in images])
+        batch = torch.from_numpy(arr).permute(0, 3, 1, 2).div_(255.0)
+        batch = batch.pin_memory().to(self.device, non_blocking=True, dtype=self.torch_dtype)
+        # Match the channels_last layout the conv modules run in
+        return batch.contiguous(memory_format=torch.channels_last)
+
+    def enhance_images(self, images: List[Image.Image], parameters: Dict[str, Any]) -> List[Image.Image]:
+        """
+        Enhance a batch of same-sized images using Flux.
+
         Args:
-            image: Input PIL Image
+            images: Input PIL Images, all the same size
             parameters: Processing parameters
-            
+
         Returns:
-            Image.Image: Enhanced image
+            List[Image.Image]: Enhanced images, in input order
         """
         try:
             # Prepare parameters
@@ -171,73 +417,91 @@ class FluxImageProcessor:
             guidance_scale = parameters.get("guidance_scale", 7.5)
             strength = parameters.get("strength", 0.8)
             seed = parameters.get("seed")
-            
-            # Set random seed if provided
-            if seed is not None:
-                torch.manual_seed(seed)
-                np.random.seed(seed)
-            
-            # Process image
-            with torch.autocast(self.device):
+
+            # One call of batch size N runs steps launches on an N-wide
+            # tensor instead of N*steps launches on single images
+            with torch.inference_mode(), torch.autocast(self.device, dtype=self.torch_dtype):
                 result = self.flux_pipe(
-                    image=image,
+                    image=self._to_device_batch(images),
                     num_inference_steps=steps,
                     guidance_scale=guidance_scale,
                     strength=strength,
-                    generator=torch.Generator(device=self.device).manual_seed(seed) if seed else None
+                    generator=self._seeded_generator(seed)
                 )
-            
-            return result.images[0]
-            
+
+            return list(result.images)
+
         except Exception as e:
-            logger.error(f"Error enhancing image: {str(e)}")
+            logger.error(f"Error enhancing images: {str(e)}")
             raise
-    
-    def upscale_image(self, image: Image.Image, parameters: Dict[str, Any]) -> Image.Image:
+
+    def enhance_image(self, image: Image.Image, parameters: Dict[str, Any]) -> Image.Image:
         """
-        Upscale image using LoRA model.
-        
+        Enhance image quality using Flux.
+
         Args:
             image: Input PIL Image
             parameters: Processing parameters
-            
+
         Returns:
-            Image.Image: Upscaled image
+            Image.Image: Enhanced image
+        """
+        return self.enhance_images([image], parameters)[0]
+
+    def upscale_images(self, images: List[Image.Image], parameters: Dict[str, Any]) -> List[Image.Image]:
+        """
+        Upscale a batch of same-sized images using the LoRA model.
+
+        Args:
+            images: Input PIL Images, all the same size
+            parameters: Processing parameters
+
+        Returns:
+            List[Image.Image]: Upscaled images, in input order
         """
         try:
             upscale_factor = parameters.get("upscale_factor", 2)
             steps = parameters.get("steps", 20)
             guidance_scale = parameters.get("guidance_scale", 7.5)
             seed = parameters.get("seed")
-            
-            # Set random seed if provided
-            if seed is not None:
-                torch.manual_seed(seed)
-                np.random.seed(seed)
-            
-            # Calculate target size
-            original_size = image.size
+
+            # Calculate target size (all images in the batch share a size)
+            original_size = images[0].size
             target_size = (
                 original_size[0] * upscale_factor,
                 original_size[1] * upscale_factor
             )
-            
+
             # Process with LoRA
-            with torch.autocast(self.device):
+            with torch.inference_mode(), torch.autocast(self.device, dtype=self.torch_dtype):
                 result = self.flux_pipe(
-                    image=image,
+                    image=self._to_device_batch(images),
                     num_inference_steps=steps,
                     guidance_scale=guidance_scale,
                     height=target_size[1],
                     width=target_size[0],
-                    generator=torch.Generator(device=self.device).manual_seed(seed) if seed else None
+                    generator=self._seeded_generator(seed)
                 )
-            
-            return result.images[0]
-            
+
+            return list(result.images)
+
         except Exception as e:
-            logger.error(f"Error upscaling image: {str(e)}")
+            logger.error(f"Error upscaling images: {str(e)}")
             raise
+
+    def upscale_image(self, image: Image.Image, parameters: Dict[str, Any]) -> Image.Image:
+        """
+        Upscale image using LoRA model.
+
+        Args:
+            image: Input PIL Image
+            parameters: Processing parameters
+
+        Returns:
+            Image.Image: Upscaled image
+        """
+        return self.upscale_images([image], parameters)[0]
+
     
     def process_image(self, image_data: str, operation: str, parameters: Dict[str, Any]) -> Image.Image:
         """
@@ -252,17 +516,8 @@ class FluxImageProcessor:
             Image.Image: Processed image
         """
         try:
-            # Decode image
-            if image_data.startswith("data:image/"):
-                image_data = image_data.split(",", 1)[1]
-            
-            img_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(img_bytes))
-            
-            # Convert to RGB if necessary
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-            
+            image = _decode_image(image_data)
+
             # Process based on operation
             if operation == "enhance":
                 return self.enhance_image(image, parameters)
@@ -270,16 +525,76 @@ class FluxImageProcessor:
                 return self.upscale_image(image, parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
-                
+
         except Exception as e:
             logger.error(f"Error processing image: {str(e)}")
             raise
+        finally:
+            # Release transient activations so back-to-back jobs at
+            # different resolutions don't accumulate cached blocks
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+
+    def process_image_batch(self, images: List[Image.Image], operation: str, parameters: Dict[str, Any]) -> List[Image.Image]:
+        """
+        Process a batch of decoded images with as few pipeline calls as possible.
+
+        The pipeline only batches tensors of one shape, so images are
+        grouped by size and each group runs as a single batched call.
+
+        Args:
+            images: Decoded RGB PIL images (see decode_images)
+            operation: Processing operation (enhance/upscale)
+            parameters: Processing parameters
+
+        Returns:
+            List[Image.Image]: Processed images, in input order
+        """
+        try:
+            # Group indices by image size so each pipeline call is uniform
+            groups: Dict[Any, List[int]] = {}
+            for idx, image in enumerate(images):
+                groups.setdefault(image.size, []).append(idx)
+
+            if operation == "enhance":
+                run_batch = self.enhance_images
+            elif operation == "upscale":
+                run_batch = self.upscale_images
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+
+            results: List[Image.Image] = [None] * len(images)
+            for indices in groups.values():
+                batch_results = run_batch([images[i] for i in indices], parameters)
+                for i, result in zip(indices, batch_results):
+                    results[i] = result
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Error processing image batch: {str(e)}")
+            raise
+        finally:
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
 
 
 # Global processor instance
 processor = FluxImageProcessor()
 
 
+@worker_process_init.connect
+def preload_models(**kwargs):
+    """Load models while the worker process boots.
+
+    Loading here instead of inside the first task means model weights
+    stream from disk during startup rather than while a user job (and
+    its DB session) waits, and a broken model path kills the worker at
+    boot instead of failing jobs.
+    """
+    processor.load_models()
+
+
 @celery_app.task(bind=True, name="process_images_task")
 def process_images_task(self, job_id: str, request_data: Dict[str, Any]):
     """
@@ -290,7 +605,7 @@ def process_images_task(self, job_id: str, request_data: Dict[str, Any]):
         request_data: Processing request data
     """
     start_time = time.time()
-    db = SessionLocal()
+    db = WorkerSession()
     
     try:
         logger.info(f"Starting image processing for job {job_id}")
@@ -298,9 +613,6 @@ def process_images_task(self, job_id: str, request_data: Dict[str, Any]):
         # Initialize services
         image_service = ImageService(db)
         
-        # Load models if not already loaded
-        processor.load_models()
-        
         # Update job status to processing
         image_service.update_job_status(job_id, "processing", progress=0)
         
@@ -309,33 +621,47 @@ def process_images_task(self, job_id: str, request_data: Dict[str, Any]):
         operation = request_data["operation"]
         parameters = request_data["parameters"]
         
-        # Process each image
+        # Decode everything up front on the thread pool so base64 and PIL
+        # work doesn't sit between GPU batches
+        decoded_images = decode_images([image_data["data"] for image_data in images])
+
+        # Process images in batches: the GEMMs that dominate Flux are
+        # batch-parallel, so an N-wide call costs far less than N calls
         processed_images = []
         total_images = len(images)
-        
-        for i, image_data in enumerate(images):
+        batch_size = max(1, settings.max_batch_size)
+        last_progress = 0
+
+        for start in range(0, total_images, batch_size):
+            batch = decoded_images[start:start + batch_size]
             try:
-                logger.info(f"Processing image {i+1}/{total_images} for job {job_id}")
-                
-                # Process image
-                result_image = processor.process_image(
-                    image_data["data"],
+                # %-style defers formatting to emit time, so a disabled or
+                # filtered logger costs nothing per batch
+                logger.info(
+                    "Processing images %d-%d/%d for job %s",
+                    start + 1, start + len(batch), total_images, job_id
+                )
+
+                processed_images.extend(processor.process_image_batch(
+                    batch,
                     operation,
                     parameters
-                )
-                
-                processed_images.append(result_image)
-                
-                # Update progress
-                progress = int((i + 1) / total_images * 90)  # 90% for processing, 10% for saving
-                image_service.update_job_status(job_id, "processing", progress=progress)
-                
-                logger.info(f"Completed image {i+1}/{total_images} for job {job_id}")
-                
+                ))
+
+                # Progress writes are throttled to >=5 point jumps so DB
+                # round-trips never pace the GPU loop
+                progress = int(len(processed_images) / total_images * 90)  # 90% for processing, 10% for saving
+                if progress - last_progress >= 5:
+                    image_service.update_job_status(job_id, "processing", progress=progress)
+                    last_progress = progress
+
             except Exception as e:
-                logger.error(f"Error processing image {i+1} for job {job_id}: {str(e)}")
+                logger.error("Error processing batch starting at image %d for job %s: %s", start + 1, job_id, e)
                 raise
         
+        if processor.device == "cuda":
+            torch.cuda.empty_cache()
+
         # Save output images
         logger.info(f"Saving output images for job {job_id}")
         output_urls = image_service.save_output_images(job_id, processed_images)
@@ -383,7 +709,7 @@ def process_images_task(self, job_id: str, request_data: Dict[str, Any]):
         raise self.retry(exc=e, countdown=60, max_retries=3)
         
     finally:
-        db.close()
+        WorkerSession.remove()
 
 
 @celery_app.task(name="cleanup_job_task")
@@ -395,7 +721,7 @@ def cleanup_job_task(job_id: str):
         job_id: Job identifier
     """
     try:
-        db = SessionLocal()
+        db = WorkerSession()
         image_service = ImageService(db)
         
         # Clean up input files but keep outputs for download
@@ -406,7 +732,25 @@ def cleanup_job_task(job_id: str):
     except Exception as e:
         logger.error(f"Error cleaning up job {job_id}: {str(e)}")
     finally:
-        db.close()
+        WorkerSession.remove()
+
+
+# Shared webhook client: keep-alive connections skip the TCP + TLS
+# handshake on repeat deliveries to the same endpoints, and HTTP/2
+# multiplexes concurrent webhooks over one connection
+_webhook_client = None
+
+
+def _get_webhook_client():
+    """Return the shared keep-alive HTTP client, creating it on first use."""
+    global _webhook_client
+    if _webhook_client is None:
+        _webhook_client = httpx.Client(
+            timeout=settings.webhook_timeout,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    return _webhook_client
 
 
 @celery_app.task(name="send_webhook_notification")
@@ -420,17 +764,14 @@ def send_webhook_notification(job_id: str, callback_url: str, status: str):
         status: Job status
     """
     try:
-        import httpx
-        
         payload = {
             "job_id": job_id,
             "status": status,
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        with httpx.Client(timeout=30) as client:
-            response = client.post(callback_url, json=payload)
-            response.raise_for_status()
+        response = _get_webhook_client().post(callback_url, json=payload)
+        response.raise_for_status()
         
         logger.info(f"Webhook notification sent for job {job_id}")
         
@@ -442,16 +783,33 @@ def cleanup_old_job_files():
     """Clean up old job files (called by periodic task)."""
     try:
         storage_path = Path(settings.storage_path) / "jobs"
-        cutoff_date = datetime.now() - timedelta(days=7)  # Keep files for 7 days
-        
-        for job_dir in storage_path.iterdir():
-            if job_dir.is_dir():
-                # Check directory modification time
-                dir_mtime = datetime.fromtimestamp(job_dir.stat().st_mtime)
-                if dir_mtime < cutoff_date:
-                    import shutil
-                    shutil.rmtree(job_dir)
-                    logger.info(f"Cleaned up old job directory: {job_dir.name}")
-        
+        cutoff = time.time() - 7 * 86400  # Keep files for 7 days
+
+        # scandir reuses the stat the directory listing already fetched,
+        # and raw mtimes compare fine without datetime round-trips
+        stale = []
+        with os.scandir(storage_path) as entries:
+            for entry in entries:
+                try:
+                    if (
+                        entry.is_dir(follow_symlinks=False)
+                        and entry.stat(follow_symlinks=False).st_mtime < cutoff
+                    ):
+                        stale.append(entry.path)
+                except OSError:
+                    continue  # Directory vanished mid-scan
+
+        if not stale:
+            return
+
+        def _remove(path: str):
+            shutil.rmtree(path, ignore_errors=True)
+            logger.info(f"Cleaned up old job directory: {os.path.basename(path)}")
+
+        # Deletions are unlink-bound; parallel workers hide per-syscall
+        # latency on networked or spinning storage
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(_remove, stale))
+
     except Exception as e:
         logger.error(f"Error cleaning up old job files: {str(e)}")